@@ -1,13 +1,37 @@
 #!/usr/bin/env python3
 import streamlit as st
-from datetime import date
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from datetime import date, datetime, timedelta, timezone
 from PIL import Image
+import numpy as np
+import pandas as pd
 from fpdf import FPDF
+from pypdf import PdfReader
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject, TextStringObject
+from image_tools import IMAGE_EXTS, process_image
 import smtplib
 from email.message import EmailMessage
+from email import message_from_bytes, policy as email_policy
 import os
 from pathlib import Path
+from types import SimpleNamespace
+import asyncio
 import base64
+import csv
+import hashlib
+import html
+import json
+import io
+import re
+import sqlite3
+import threading
+import time
+import urllib.request
+import uuid
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from email.mime.text import MIMEText
 
 
@@ -26,6 +50,21 @@ APP_PASSWORD = st.secrets["APP_PASSWORD"]             # << fill later
 DEFAULT_EMAIL = st.secrets["DEFAULT_EMAIL"]     # << fill later
 USERS_FILE = None
 ALLOWED_USERS = st.secrets.get("USERS")   # fallback list
+NOTIFY_CC = list(st.secrets.get("NOTIFY_CC", []))   # optional PI / vet addresses copied on every request
+WEBHOOK_URL = st.secrets.get("WEBHOOK_URL")          # optional Teams/Slack incoming webhook
+NOTIFY_TIMEOUTS = {"facility": 30, "receipt": 30, "cc": 30, "webhook": 5, **st.secrets.get("NOTIFY_TIMEOUTS", {})}   # seconds per channel
+CAGE_REGISTRY_FILE = Path(st.secrets.get("CAGE_REGISTRY", Path(__file__).parent / "cage_registry.csv"))
+SESSION_IDLE_TTL_S = int(st.secrets.get("SESSION_IDLE_TTL_MIN", 60)) * 60   # release idle sessions' uploads after this
+SHOW_MEMORY_GAUGE = bool(st.secrets.get("SHOW_MEMORY_GAUGE", False))
+DIGEST_MODE = st.secrets.get("DIGEST_MODE", "off")   # "off", "hourly" or "daily"
+DIGEST_HOUR = int(st.secrets.get("DIGEST_HOUR", 8))   # send time for daily digests
+DIGEST_DIR = Path(st.secrets.get("DIGEST_DIR", Path(__file__).parent / "digest_queue"))
+DRAFT_DB = Path(st.secrets.get("DRAFT_DB", Path(__file__).parent / "drafts.sqlite3"))
+DRAFT_SPOOL_DIR = Path(st.secrets.get("DRAFT_SPOOL_DIR", Path(__file__).parent / "draft_uploads"))
+DRAFT_TTL_DAYS = int(st.secrets.get("DRAFT_TTL_DAYS", 14))   # unsubmitted drafts are deleted after this
+SUBMISSION_LOG = Path(st.secrets.get("SUBMISSION_LOG", Path(__file__).parent / "submissions.jsonl"))
+REPORT_DIR = Path(st.secrets.get("REPORT_DIR", Path(__file__).parent / "reports"))
+REPORT_USERS = [u.lower() for u in st.secrets.get("REPORT_USERS", [])]   # access keys that see the reports panel
 
 # ─────────────────────────────
 # Utility functions
@@ -59,6 +98,339 @@ if "filename" not in st.session_state:
 	st.session_state.filename = None
 if "attachments" not in st.session_state:
 	st.session_state.attachments = None
+if "uploader_nonce" not in st.session_state:
+	st.session_state.uploader_nonce = 0   # bumped after a release so the uploaders start empty
+	
+	
+# =========================================================
+# SESSION MEMORY — accounting, release and idle eviction
+# =========================================================
+SESSION_HEARTBEAT_S = 60
+# Session state keys holding per-session upload/render data (released after dispatch or when idle)
+RELEASABLE_STATE = (
+	"attachments", "form_data", "inspections", "inspect_jobs", "upload_digests",
+	"auto_ticked", "preview_pending", "preview_rendered", "preview_changed_at",
+	"draft_uploads", "draft_cohort",
+)
+
+
+def uploader_key(name):
+	"""Widget key for a file uploader; changes after a release so the widget comes back empty."""
+	return f"{name}_{st.session_state.uploader_nonce}"
+
+
+def session_bytes():
+	"""Approximate memory held by this session: upload buffers plus form/preview state."""
+	total = 0
+	for key in (uploader_key("file_uploader"), uploader_key("cohort_csv"), "draft_uploads", "draft_cohort"):
+		files = st.session_state.get(key) or []
+		for f in files if isinstance(files, list) else [files]:
+			total += f.size
+	for key in ("form_data", "preview_pending", "preview_rendered"):
+		value = st.session_state.get(key)
+		if value:
+			total += len(repr(value))
+	return total
+
+
+@st.cache_resource
+def session_registry():
+	"""session id -> {"bytes", "last_seen"}; shared by all sessions for the memory gauge."""
+	return {}
+
+
+def account_session():
+	"""Record this session's memory use and drop registry entries of sessions that have gone away."""
+	registry = session_registry()
+	now = time.monotonic()
+	ctx = get_script_run_ctx()
+	if ctx is not None:
+		registry[ctx.session_id] = {"bytes": session_bytes(), "last_seen": now}
+	for sid, entry in list(registry.items()):
+		if now - entry["last_seen"] > 3 * SESSION_HEARTBEAT_S:
+			registry.pop(sid, None)
+	return sum(e["bytes"] for e in registry.values()), len(registry)
+
+
+def free_uploaded_files():
+	"""
+	Remove the uploaders' files from Streamlit's upload manager. It only frees them when
+	the user clicks ✕ or the session ends, not when the widget goes away (st.chat_input
+	frees its files the same way).
+	"""
+	ctx = get_script_run_ctx()
+	remove_file = getattr(ctx.uploaded_file_mgr, "remove_file", None) if ctx is not None else None
+	if remove_file is None:
+		return
+	for key in (uploader_key("file_uploader"), uploader_key("cohort_csv")):
+		files = st.session_state.get(key) or []
+		for f in files if isinstance(files, list) else [files]:
+			remove_file(session_id=ctx.session_id, file_id=f.file_id)
+			
+			
+def release_session_memory():
+	"""Drop this session's uploads and render state, then give the uploaders fresh (empty) keys."""
+	free_uploaded_files()
+	for key in RELEASABLE_STATE:
+		st.session_state.pop(key, None)
+	st.session_state.attachments = None
+	st.session_state.form_data = None
+	st.session_state.uploader_nonce += 1
+	
+	
+@st.fragment(run_every=SESSION_HEARTBEAT_S)
+def session_heartbeat():
+	"""
+	Runs on a timer even while the user is idle: keeps the memory gauge current
+	and releases this session's uploads once it has been idle for SESSION_IDLE_TTL_S.
+	"""
+	account_session()
+	idle = time.monotonic() - st.session_state.get("last_active", time.monotonic())
+	if idle > SESSION_IDLE_TTL_S and session_bytes() > 0:
+		print(f"♻️ Releasing {session_bytes() / 1e6:.1f} MB from a session idle for {idle / 60:.0f} min")
+		release_session_memory()
+		st.session_state.evicted = True
+		st.session_state.draft_relink = "draft_id" in st.session_state   # re-link spooled uploads when the user is back
+		st.rerun()
+		
+		
+# Full script runs are user activity; fragment runs (heartbeat, preview, watchers) are not
+st.session_state.last_active = time.monotonic()
+total_session_bytes, session_count = account_session()
+evicted = st.session_state.pop("evicted", False)
+if evicted:
+	st.warning(
+		f"This session was idle for more than {SESSION_IDLE_TTL_S // 60} minutes, so uploaded files were released. "
+		"Attachments saved with your draft are re-linked automatically; please re-upload any others."
+	)
+	
+	
+# =========================================================
+# DRAFTS — autosave to a local SQLite store, restore after reloads/timeouts
+# =========================================================
+DRAFT_DEBOUNCE_S = 2.0   # write once edits have settled for this long
+DRAFT_RECENT = 5         # other drafts offered for resuming in the sidebar
+# Session keys saved besides the FORM_SCHEMA widgets
+DRAFT_EXTRA_KEYS = (
+	"fac_email", "dob_fields", "dob1", "dob2", "dob3", "cages", "tumour_toggle",
+	"copy", "packet", "chk_monitor", "chk_cage", "chk_tumour",
+)
+# Draft field holding [name, sha256] upload references -> session key of the re-linked files
+DRAFT_UPLOADS = {"__attachments__": "draft_uploads", "__cohort__": "draft_cohort"}
+
+
+class SpooledUpload(io.BytesIO):
+	"""An upload re-linked from the draft spool; quacks like Streamlit's UploadedFile."""
+	def __init__(self, name, digest, data):
+		super().__init__(data)
+		self.name = name
+		self.size = len(data)
+		self.file_id = f"draft-{digest}"
+		
+		
+@st.cache_resource
+def draft_db():
+	"""SQLite store shared by all sessions (use under draft_lock()); stale drafts are pruned on open."""
+	DRAFT_SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+	db = sqlite3.connect(str(DRAFT_DB), check_same_thread=False)
+	db.execute("PRAGMA journal_mode=WAL")
+	db.executescript("""
+		CREATE TABLE IF NOT EXISTS drafts (
+			owner TEXT, draft_id TEXT, updated_at REAL,
+			PRIMARY KEY (owner, draft_id));
+		CREATE TABLE IF NOT EXISTS draft_fields (
+			owner TEXT, draft_id TEXT, field TEXT, value TEXT,
+			PRIMARY KEY (owner, draft_id, field));
+	""")
+	prune_drafts(db)
+	return db
+
+
+@st.cache_resource
+def draft_lock():
+	return threading.Lock()
+
+
+def prune_drafts(db):
+	"""Delete drafts older than DRAFT_TTL_DAYS and spooled uploads no draft refers to any more."""
+	cutoff = time.time() - DRAFT_TTL_DAYS * 86400
+	with db:
+		db.execute("DELETE FROM draft_fields WHERE (owner, draft_id) IN (SELECT owner, draft_id FROM drafts WHERE updated_at < ?)", (cutoff,))
+		db.execute("DELETE FROM drafts WHERE updated_at < ?", (cutoff,))
+	referenced = set()
+	for (value,) in db.execute("SELECT value FROM draft_fields WHERE field IN (?, ?)", tuple(DRAFT_UPLOADS)):
+		referenced.update(digest for _, digest in json.loads(value))
+	for path in DRAFT_SPOOL_DIR.iterdir():
+		# Recent files may belong to a draft whose next save is still pending
+		if path.name not in referenced and path.stat().st_mtime < time.time() - 3600:
+			path.unlink(missing_ok=True)
+			
+			
+def draft_owner(access_key):
+	"""Drafts are keyed by a hash of the access key, never the key itself."""
+	return hashlib.sha256(access_key.strip().lower().encode()).hexdigest()[:32]
+
+
+def draft_keys():
+	return tuple(FORM.widgets) + DRAFT_EXTRA_KEYS
+
+
+def _draft_encode(value):
+	if isinstance(value, date):
+		return json.dumps({"date": value.isoformat()})
+	return json.dumps(value)
+
+
+def _draft_decode(text):
+	value = json.loads(text)
+	if isinstance(value, dict) and "date" in value:
+		return date.fromisoformat(value["date"])
+	return value
+
+
+def save_draft(owner, draft_id, changed, removed):
+	"""Write only the fields that changed since the last save."""
+	db = draft_db()
+	with draft_lock(), db:
+		db.executemany("INSERT OR REPLACE INTO draft_fields VALUES (?, ?, ?, ?)", [(owner, draft_id, k, v) for k, v in changed.items()])
+		db.executemany("DELETE FROM draft_fields WHERE owner = ? AND draft_id = ? AND field = ?", [(owner, draft_id, k) for k in removed])
+		db.execute("INSERT OR REPLACE INTO drafts VALUES (?, ?, ?)", (owner, draft_id, time.time()))
+		
+		
+def load_draft(owner, draft_id):
+	"""{field: encoded value} of a stored draft (empty if there is none)."""
+	with draft_lock():
+		rows = draft_db().execute("SELECT field, value FROM draft_fields WHERE owner = ? AND draft_id = ?", (owner, draft_id)).fetchall()
+	return dict(rows)
+
+
+def list_drafts(owner):
+	"""(draft_id, updated_at, protocol) of the owner's most recently saved drafts."""
+	with draft_lock():
+		return draft_db().execute("""
+			SELECT d.draft_id, d.updated_at, f.value FROM drafts d
+			LEFT JOIN draft_fields f ON f.owner = d.owner AND f.draft_id = d.draft_id AND f.field = 'prot'
+			WHERE d.owner = ? ORDER BY d.updated_at DESC LIMIT ?""", (owner, DRAFT_RECENT + 1)).fetchall()
+			
+			
+def delete_draft(owner, draft_id):
+	db = draft_db()
+	with draft_lock():
+		with db:
+			db.execute("DELETE FROM draft_fields WHERE owner = ? AND draft_id = ?", (owner, draft_id))
+			db.execute("DELETE FROM drafts WHERE owner = ? AND draft_id = ?", (owner, draft_id))
+		prune_drafts(db)
+		
+		
+def spool_upload(f, digest):
+	"""Keep a content-addressed copy of an upload on disk so a restored draft can re-link it."""
+	path = DRAFT_SPOOL_DIR / digest
+	if not path.exists():
+		part = path.with_suffix(".part")
+		part.write_bytes(f.getvalue())
+		part.replace(path)
+		
+		
+def spooled_uploads(refs):
+	"""SpooledUploads for [name, sha256] references, plus how many spool files were missing."""
+	files, missing = [], 0
+	for name, digest in refs:
+		path = DRAFT_SPOOL_DIR / digest
+		if path.exists():
+			files.append(SpooledUpload(name, digest, path.read_bytes()))
+		else:
+			missing += 1
+	return files, missing
+
+
+def restore_draft(owner, draft_id, fields=None):
+	"""
+	Stage a stored draft and rerun: widget values can only be set before the
+	widgets are drawn, so apply_draft_restore() applies them at the top of the next run.
+	"""
+	fields = load_draft(owner, draft_id) if fields is None else fields
+	missing = 0
+	for field, state_key in DRAFT_UPLOADS.items():
+		st.session_state[state_key], lost = spooled_uploads(json.loads(fields.get(field, "[]")))
+		missing += lost
+	values = {k: _draft_decode(v) for k, v in fields.items() if k not in DRAFT_UPLOADS}
+	st.session_state.draft_restore = {"set": values, "clear": [k for k in draft_keys() if k not in values]}
+	st.session_state.draft_id = draft_id
+	st.session_state.draft_saved = dict(fields)
+	st.session_state.draft_notice = (
+		"📝 Draft restored." + (f" {missing} attachment(s) could not be re-linked; please upload them again." if missing else "")
+	)
+	st.query_params["draft"] = draft_id
+	st.rerun()
+	
+	
+def apply_draft_restore():
+	"""Apply a draft staged by restore_draft(), or re-link its uploads after an idle release."""
+	staged = st.session_state.pop("draft_restore", None)
+	if staged:
+		for key in staged["clear"]:
+			st.session_state.pop(key, None)
+		st.session_state.update(staged["set"])
+	if st.session_state.get("draft_relink") and not evicted:
+		fields = load_draft(st.session_state.draft_owner, st.session_state.draft_id)
+		for field, state_key in DRAFT_UPLOADS.items():
+			st.session_state[state_key] = spooled_uploads(json.loads(fields.get(field, "[]")))[0]
+		st.session_state.draft_relink = False
+		
+		
+def with_draft_uploads(files, state_key):
+	"""Uploader files plus the ones re-linked from a draft (a fresh upload with the same name wins)."""
+	files = [f for f in (files if isinstance(files, list) else [files]) if f is not None]
+	names = {f.name for f in files}
+	return files + [f for f in st.session_state.get(state_key) or [] if f.name not in names]
+
+
+def queue_draft(uploads, cohort):
+	"""Record the current form as the pending draft; draft_autosaver() writes it once edits settle."""
+	snapshot = {k: _draft_encode(st.session_state[k]) for k in draft_keys() if k in st.session_state}
+	for field, files in (("__attachments__", uploads), ("__cohort__", cohort)):
+		refs = []
+		for f in files:
+			digest = upload_digest(f)
+			spool_upload(f, digest)
+			refs.append([f.name, digest])
+		snapshot[field] = json.dumps(refs)
+	if st.session_state.get("draft_saved") is None:
+		st.session_state.draft_saved = snapshot   # new draft: the untouched form is the baseline, nothing to write
+	if st.session_state.get("draft_pending") != snapshot:
+		st.session_state.draft_pending = snapshot
+		st.session_state.draft_changed_at = time.monotonic()
+		
+		
+@st.fragment(run_every=DRAFT_DEBOUNCE_S)
+def draft_autosaver():
+	"""Debounced autosave: writes only the fields that differ from the last saved version."""
+	pending = st.session_state.get("draft_pending")
+	saved = st.session_state.get("draft_saved") or {}
+	settled = time.monotonic() - st.session_state.get("draft_changed_at", 0) >= DRAFT_DEBOUNCE_S
+	if pending and settled and pending != saved:
+		changed = {k: v for k, v in pending.items() if saved.get(k) != v}
+		removed = [k for k in saved if k not in pending]
+		try:
+			save_draft(st.session_state.draft_owner, st.session_state.draft_id, changed, removed)
+			st.session_state.draft_saved = pending
+			st.session_state.draft_saved_at = datetime.now()
+		except sqlite3.Error as e:
+			print(f"⚠️ Draft save failed: {e}")
+	if st.session_state.get("draft_saved_at"):
+		st.caption(f"💾 Draft saved at {st.session_state.draft_saved_at:%H:%M:%S}")
+		
+		
+def discard_draft():
+	"""Delete this session's draft (after a successful submission) and forget it."""
+	if "draft_id" in st.session_state:
+		delete_draft(st.session_state.draft_owner, st.session_state.draft_id)
+	for key in ("draft_id", "draft_saved", "draft_pending", "draft_changed_at", "draft_saved_at"):
+		st.session_state.pop(key, None)
+	st.query_params.pop("draft", None)
+	
+	
+apply_draft_restore()
 	
 	
 # =============================
@@ -71,11 +443,49 @@ TEXT_GREY = (70, 70, 70)
 TEXT_BLACK = (0, 0, 0)
 
 
+# Unicode the core PDF fonts cannot encode
+PDF_REPLACEMENTS = {
+	"—": "-", "–": "-", "•": "-",
+	"·": "-", "‒": "-",
+	"“": '"', "”": '"', "‘": "'", "’": "'",
+	"…": "...", "µ": "u", "²": "2", "³": "3", "⁴": "4",
+}
+
+# Values of these fields are split into items and drawn as a grid once long
+PDF_LIST_FIELDS = {
+	"Cages": re.compile(r",\s*"),
+	"DOB Entries": re.compile(r"(?<=\d{4}),\s*"),   # dates themselves contain ", "
+}
+PDF_GRID_MIN_ITEMS = 12
+# Creation date for forms without a transfer date (see pdf_creation_date())
+PDF_UNDATED = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def pdf_text(text):
+	"""Replace problematic Unicode and force to Latin-1 compatible text."""
+	text = str(text)
+	for bad, good in PDF_REPLACEMENTS.items():
+		text = text.replace(bad, good)
+	return text.encode("latin-1", "replace").decode("latin-1")
+
+
 # Define a reliable absolute path to the logo
 LOGO_PATH = Path(__file__).parent / "LOGO2_flat.png"
 
 	
 class TransferPDF(FPDF):
+	def __init__(self, *args, doc_id=None, creation_date=PDF_UNDATED, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.section_pages = []   # (section title, page number) — used for packet bookmarks
+		self.doc_id = doc_id      # see pdf_document_id()
+		self.set_creation_date(creation_date)
+		if doc_id:
+			self.set_keywords(f"form-sha256:{doc_id}")
+			
+	def file_id(self):
+		"""Trailer /ID derived from the form content instead of fpdf2's default."""
+		return f"<{self.doc_id.upper()}><{self.doc_id.upper()}>" if self.doc_id else -1
+		
 	def header(self):
 		# Draw dark header background
 		self.set_fill_color(*PRIMARY_COLOR)
@@ -99,6 +509,7 @@ class TransferPDF(FPDF):
 		self.ln(12)
 		
 	def section_title(self, title):
+		self.section_pages.append((title, self.page_no()))
 		self.set_draw_color(220, 220, 220)
 		self.ln(2)
 		#self.line(10, self.get_y(), 200, self.get_y())
@@ -111,22 +522,8 @@ class TransferPDF(FPDF):
 		
 	def field(self, label, value):
 		"""Write one label/value row, cleaning unsupported Unicode."""
-		label = str(label) if label else "-"
-		value = "-" if not value else str(value)
-		
-		# Replace problematic Unicode
-		replacements = {
-			"—": "-", "–": "-", "•": "-",
-			"·": "-", "‒": "-",
-			"“": '"', "”": '"', "‘": "'", "’": "'",
-			"…": "...", "µ": "u", "²": "2", "³": "3", "⁴": "4",
-		}
-		for bad, good in replacements.items():
-			label = label.replace(bad, good)
-			value = value.replace(bad, good)
-			
-		# Force to Latin-1 compatible bytes then back
-		value = value.encode("latin-1", "replace").decode("latin-1")
+		label = pdf_text(label) if label else "-"
+		value = "-" if not value else pdf_text(value)
 		
 		# Label
 		self.set_font("Arial", "B", 10)
@@ -139,10 +536,116 @@ class TransferPDF(FPDF):
 		self.multi_cell(0, 5, value)
 		self.ln(0.5)
 		
+	def grid(self, items, row_h=4, font_size=8, continued=None):
+		"""
+		Lay out many short items (cage numbers, dates) in a dense multi-column grid.
+		Items are set in a monospace font so each grid row is written as a single
+		cell; `continued` is repeated at the top of each new page.
+		"""
+		items = [pdf_text(i).strip() for i in items]
+		self.set_font("Courier", "", font_size)
+		usable = self.w - self.l_margin - self.r_margin
+		col_chars = max(len(i) for i in items) + 2
+		cols = max(1, int(usable // (self.get_string_width("0") * col_chars)))
+		
+		self.set_text_color(*TEXT_BLACK)
+		for start in range(0, len(items), cols):
+			if self.will_page_break(row_h):
+				self.add_page()
+				if continued:
+					self.field(continued, "(continued)")
+					self.set_font("Courier", "", font_size)
+					self.set_text_color(*TEXT_BLACK)
+			self.cell(usable, row_h, "".join(i.ljust(col_chars) for i in items[start:start + cols]))
+			self.ln(row_h)
+		self.ln(1)
 		
-def create_pdf(form_data, attachments, filename):
-	"""Generate PDF safely using TransferPDF class."""
-	pdf = TransferPDF()
+	def table(self, headers, rows, widths, line_h=4.5, batch=64):
+		"""
+		Bordered table with wrapped cells and the header row repeated on every page.
+		Row heights are measured a batch at a time: a string-width check for
+		single-line cells, a dry-run layout only for cells that need wrapping.
+		"""
+		def draw_header():
+			self.set_font("Arial", "B", 9)
+			self.set_fill_color(*SECTION_BG)
+			self.set_text_color(*PRIMARY_COLOR)
+			for text, w in zip(headers, widths):
+				self.cell(w, line_h + 1, text, border=1, fill=True)
+			self.ln(line_h + 1)
+			self.set_font("Arial", "", 9)
+			self.set_text_color(*TEXT_BLACK)
+			
+		def lines(text, w):
+			if self.get_string_width(text) <= w - 2 * self.c_margin:
+				return 1
+			return len(self.multi_cell(w, line_h, text, dry_run=True, output="LINES"))
+			
+		draw_header()
+		for b in range(0, len(rows), batch):
+			chunk = [[pdf_text(c) for c in row] for row in rows[b:b + batch]]
+			heights = [max(lines(text, w) for text, w in zip(row, widths)) for row in chunk]
+			for row, n in zip(chunk, heights):
+				h = n * line_h
+				if self.will_page_break(h):
+					self.add_page()
+					draw_header()
+				if n == 1:
+					for text, w in zip(row, widths):
+						self.cell(w, h, text, border=1)
+					self.ln(h)
+					continue
+				x, y = self.l_margin, self.get_y()
+				for text, w in zip(row, widths):
+					self.rect(x, y, w, h)
+					self.set_xy(x, y)
+					self.multi_cell(w, line_h, text)
+					x += w
+				self.set_xy(self.l_margin, y + h)
+				
+	def contact_sheet(self, photos, cols=4, gap=3, caption_h=4):
+		"""Grid of photo thumbnails ((name, jpeg bytes) pairs) with filename captions."""
+		usable = self.w - self.l_margin - self.r_margin
+		box = (usable - gap * (cols - 1)) / cols
+		for start in range(0, len(photos), cols):
+			if self.will_page_break(box + caption_h + gap):
+				self.add_page()
+			y = self.get_y()
+			for i, (name, thumb) in enumerate(photos[start:start + cols]):
+				x = self.l_margin + i * (box + gap)
+				self.image(io.BytesIO(thumb), x=x, y=y, w=box, h=box, keep_aspect_ratio=True)
+				self.set_xy(x, y + box)
+				self.set_font("Arial", "", 7)
+				self.set_text_color(*TEXT_BLACK)
+				name = pdf_text(name)
+				while len(name) > 4 and self.get_string_width(name) > box:
+					name = name[:-4] + "..."
+				self.cell(box, caption_h, name, align="C")
+			self.set_xy(self.l_margin, y + box + caption_h + gap)
+			
+			
+def freeze_form(form_data):
+	"""Turn form_data into nested tuples so it can be hashed / used as a cache key."""
+	return tuple(
+		(section, tuple((label, "" if value is None else str(value)) for label, value in fields.items()))
+		for section, fields in form_data.items()
+	)
+
+
+def pdf_creation_date(form_data):
+	"""
+	Creation date stamped in the PDF: the requested transfer date rather than the
+	render time, so identical forms always render to identical bytes.
+	"""
+	try:
+		return datetime.strptime(FORM.storage_row(form_data)["transfer_date"], "%b %d, %Y").replace(tzinfo=timezone.utc)
+	except (TypeError, ValueError):
+		return PDF_UNDATED
+
+
+def build_pdf(form_data, attachment_names, photos=(), doc_id=None):
+	"""Lay out the transfer form and return the (unsaved) TransferPDF."""
+	pdf = TransferPDF(doc_id=doc_id, creation_date=pdf_creation_date(form_data))
 	pdf.set_margins(12, 15, 12)
 	pdf.add_page()
 	
@@ -150,28 +653,354 @@ def create_pdf(form_data, attachments, filename):
 	for section, fields in form_data.items():
 		pdf.section_title(section)
 		for label, value in fields.items():
-			pdf.field(label, value)
+			splitter = PDF_LIST_FIELDS.get(label)
+			items = [i for i in splitter.split(str(value)) if i.strip()] if splitter and value else []
+			if len(items) > PDF_GRID_MIN_ITEMS:
+				pdf.field(label, f"{len(items)} entries")
+				pdf.grid(items, continued=label)
+			else:
+				pdf.field(label, value)
 		pdf.ln(2)
 		
 	# Attachment list
 	pdf.section_title("Attachments")
-	if not attachments:
+	if not attachment_names:
 		pdf.field("Files", "No attachments uploaded.")
 	else:
-		pdf.set_font("Arial", "B", 10)
-		pdf.cell(135, 7, "Filename", border=1)
-		pdf.cell(40, 7, "Type", border=1, ln=True)
-		pdf.set_font("Arial", "", 10)
-		for f in attachments:
-			name = f.name
-			ext = name.split(".")[-1].upper()
-			pdf.cell(135, 7, name.encode("latin-1", "replace").decode("latin-1"), border=1)
-			pdf.cell(40, 7, ext, border=1, ln=True)
-			
-	pdf.output(filename)
+		usable = pdf.w - pdf.l_margin - pdf.r_margin
+		pdf.table(
+			("Filename", "Type"),
+			[(name, name.split(".")[-1].upper()) for name in attachment_names],
+			(usable - 25, 25),
+		)
+		
+	# Photo contact sheet
+	if photos:
+		pdf.section_title(f"Photos ({len(photos)})")
+		pdf.contact_sheet(photos)
+		
+	return pdf
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def render_pdf_bytes(frozen_form, attachment_names, photo_keys=()):
+	"""Render the PDF in memory; identical inputs are served from cache."""
+	form_data = {section: dict(fields) for section, fields in frozen_form}
+	doc_id = pdf_document_id(frozen_form, attachment_names, photo_keys)
+	return bytes(build_pdf(form_data, attachment_names, photo_thumbnails(photo_keys), doc_id).output())
+
+
+def pdf_document_id(frozen_form, attachment_names, photo_keys=()):
+	"""Stable document ID: sha256 of everything the PDF is rendered from."""
+	payload = json.dumps([frozen_form, attachment_names, photo_keys], ensure_ascii=False)
+	return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def photo_keys(attachments):
+	"""(filename, sha256) of the image uploads that have finished processing."""
+	inspections = st.session_state.get("inspections") or {}
+	keys = []
+	for f in attachments or []:
+		r = inspections.get(f.name)
+		if r and r.get("image"):
+			keys.append((f.name, r["sha256"]))
+	return tuple(keys)
+
+
+def photo_thumbnails(keys):
+	"""Resolve photo_keys() to (filename, thumbnail JPEG) pairs from the inspection cache."""
+	cache = inspection_cache()
+	return [(name, cache[digest]["image"]["thumb"]) for name, digest in keys if digest in cache]
+
+
+def pdf_inputs(form_data, attachments):
+	"""Hashable render inputs (form, attachment names, photo keys) for render_pdf_bytes()."""
+	names = tuple(f.name for f in attachments) if attachments else ()
+	return freeze_form(form_data), names, photo_keys(attachments)
+
+
+def create_pdf(form_data, attachments, filename):
+	"""Generate PDF safely using TransferPDF class."""
+	with open(filename, "wb") as f:
+		f.write(render_pdf_bytes(*pdf_inputs(form_data, attachments)))
 	return filename
 
 
+def embedded_document_id(source):
+	"""Document ID carried in a PDF's trailer /ID (see TransferPDF.file_id), or None."""
+	ids = PdfReader(source).trailer.get("/ID")
+	return ids[0].original_bytes.hex() if ids else None
+
+
+def pdf_fingerprint(path):
+	"""(document ID, sha256) of a form or packet PDF on disk, both read from the file itself."""
+	return embedded_document_id(path), file_sha256(path)
+
+
+def file_sha256(path):
+	"""sha256 of a file on disk, read in chunks (packets can be large)."""
+	digest = hashlib.sha256()
+	with open(path, "rb") as f:
+		for chunk in iter(lambda: f.read(1 << 20), b""):
+			digest.update(chunk)
+	return digest.hexdigest()
+
+
+# =========================================================
+# TRANSFER PACKET (form + attachments in one PDF)
+# =========================================================
+class PacketWriter:
+	"""
+	Append pages from several PDFs into one file with bookmarks.
+	Each page's objects are written straight to disk as they are read, so only
+	one page's object graph is held in memory at a time.
+	"""
+	PAGES_NUM = 1
+	CATALOG_NUM = 2
+	
+	def __init__(self, path, doc_id=None):
+		self.doc_id = doc_id   # written as the trailer /ID, like TransferPDF.file_id()
+		self.out = open(path, "wb")
+		self.out.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+		self.offsets = {}
+		self.next_num = 3
+		self.kids = []       # object numbers of the merged pages, in order
+		self.outline = []    # (title, page index, [(child title, page index, [])])
+		
+	def _alloc(self):
+		num = self.next_num
+		self.next_num += 1
+		return num
+	
+	def _begin(self, num):
+		self.offsets[num] = self.out.tell()
+		self.out.write(f"{num} 0 obj\n".encode())
+		
+	def _end(self):
+		self.out.write(b"\nendobj\n")
+		
+	def _write_dict(self, d, refs, pending, skip=(), extra=""):
+		self.out.write(b"<<")
+		for key, value in d.items():
+			if key in skip:
+				continue
+			key.write_to_stream(self.out)
+			self.out.write(b" ")
+			self._write_value(value, refs, pending)
+			self.out.write(b"\n")
+		self.out.write(extra.encode() + b">>")
+		
+	def _write_value(self, obj, refs, pending):
+		"""Serialize one object, renumbering indirect references into this file."""
+		if isinstance(obj, IndirectObject):
+			key = (obj.idnum, obj.generation)
+			if key not in refs:
+				refs[key] = self._alloc()
+				pending.append(obj)
+			self.out.write(f"{refs[key]} 0 R".encode())
+		elif isinstance(obj, StreamObject):
+			data = obj._data
+			self._write_dict(obj, refs, pending, skip=("/Length",), extra=f"/Length {len(data)}")
+			self.out.write(b"\nstream\n")
+			self.out.write(data)
+			self.out.write(b"\nendstream")
+		elif isinstance(obj, DictionaryObject):
+			self._write_dict(obj, refs, pending)
+		elif isinstance(obj, ArrayObject):
+			self.out.write(b"[")
+			for item in obj:
+				self._write_value(item, refs, pending)
+				self.out.write(b" ")
+			self.out.write(b"]")
+		else:
+			obj.write_to_stream(self.out)
+			
+	def add_pdf(self, stream, title, sections=()):
+		"""Append every page of `stream`, bookmarked as `title` with (title, page_no) children."""
+		reader = PdfReader(stream)
+		if reader.is_encrypted:
+			reader.decrypt("")
+		first = len(self.kids)
+		
+		# Number all pages up front so links between pages resolve into this file
+		refs, page_nums = {}, []
+		for page in reader.pages:
+			num = self._alloc()
+			page_nums.append(num)
+			if page.indirect_reference is not None:
+				refs[(page.indirect_reference.idnum, page.indirect_reference.generation)] = num
+				
+		for page, num in zip(reader.pages, page_nums):
+			pending = []
+			self._begin(num)
+			self._write_dict(page, refs, pending, skip=("/Parent",), extra=f"/Parent {self.PAGES_NUM} 0 R")
+			self._end()
+			while pending:
+				ref = pending.pop()
+				obj = ref.get_object()
+				self._begin(refs[(ref.idnum, ref.generation)])
+				if obj is None or (isinstance(obj, DictionaryObject) and obj.get("/Type") in ("/Pages", "/Catalog")):
+					self.out.write(b"null")   # never pull in the source document's tree
+				else:
+					self._write_value(obj, refs, pending)
+				self._end()
+			self.kids.append(num)
+			reader.resolved_objects.clear()   # release this page's objects before the next one
+			
+		if len(self.kids) > first:
+			children = [(t, first + p - 1, []) for t, p in sections]
+			self.outline.append((title, first, children))
+		return len(self.kids) - first
+	
+	def _write_outline_items(self, entries, parent):
+		nums = [self._alloc() for _ in entries]
+		for i, (title, page_idx, children) in enumerate(entries):
+			child_nums = self._write_outline_items(children, nums[i]) if children else []
+			self._begin(nums[i])
+			self.out.write(b"<< /Title ")
+			TextStringObject(title).write_to_stream(self.out)
+			self.out.write(f" /Parent {parent} 0 R /Dest [{self.kids[page_idx]} 0 R /Fit]".encode())
+			if i > 0:
+				self.out.write(f" /Prev {nums[i - 1]} 0 R".encode())
+			if i < len(nums) - 1:
+				self.out.write(f" /Next {nums[i + 1]} 0 R".encode())
+			if child_nums:
+				self.out.write(f" /First {child_nums[0]} 0 R /Last {child_nums[-1]} 0 R /Count {len(child_nums)}".encode())
+			self.out.write(b" >>")
+			self._end()
+		return nums
+	
+	def close(self):
+		"""Write bookmarks, page tree, xref table and trailer."""
+		catalog = f"<< /Type /Catalog /Pages {self.PAGES_NUM} 0 R"
+		if self.outline:
+			root = self._alloc()
+			top = self._write_outline_items(self.outline, root)
+			self._begin(root)
+			self.out.write(f"<< /Type /Outlines /First {top[0]} 0 R /Last {top[-1]} 0 R /Count {len(top)} >>".encode())
+			self._end()
+			catalog += f" /Outlines {root} 0 R /PageMode /UseOutlines"
+			
+		self._begin(self.PAGES_NUM)
+		kids = " ".join(f"{n} 0 R" for n in self.kids)
+		self.out.write(f"<< /Type /Pages /Kids [{kids}] /Count {len(self.kids)} >>".encode())
+		self._end()
+		self._begin(self.CATALOG_NUM)
+		self.out.write(f"{catalog} >>".encode())
+		self._end()
+		
+		xref_at = self.out.tell()
+		self.out.write(f"xref\n0 {self.next_num}\n0000000000 65535 f \n".encode())
+		for num in range(1, self.next_num):
+			offset = self.offsets.get(num)
+			self.out.write(f"{offset:010d} 00000 n \n".encode() if offset is not None else b"0000000000 00000 f \n")
+		file_id = f" /ID [<{self.doc_id.upper()}><{self.doc_id.upper()}>]" if self.doc_id else ""
+		self.out.write(f"trailer\n<< /Size {self.next_num} /Root {self.CATALOG_NUM} 0 R{file_id} >>\nstartxref\n{xref_at}\n%%EOF\n".encode())
+		self.out.close()
+		
+		
+def attachment_cover_pdf(name, info):
+	"""One-page summary standing in for an attachment that cannot be merged (DOCX/XLSX)."""
+	pdf = TransferPDF()
+	pdf.set_margins(12, 15, 12)
+	pdf.add_page()
+	pdf.section_title("Attachment Summary")
+	pdf.field("File", name)
+	pdf.field("Type", name.rsplit(".", 1)[-1].upper())
+	if info:
+		kind = ATTACHMENT_KINDS[info["kind"]][0] if info.get("kind") in ATTACHMENT_KINDS else "Other document"
+		pdf.field("Size", f"{info['size'] / 1024:.0f} KB")
+		pdf.field("Pages", info.get("pages"))
+		pdf.field("Sheets", info.get("sheets"))
+		pdf.field("Classified as", kind)
+		pdf.field("Structure check", "OK" if info["ok"] else f"Failed: {info['error']}")
+		pdf.field("SHA-256", info["sha256"])
+	pdf.field("Note", "The original file is attached to the email separately.")
+	return bytes(pdf.output())
+
+
+def create_packet(form_data, attachments, inspections, filename):
+	"""
+	Stream the transfer form and every PDF attachment into one bookmarked PDF.
+	DOCX/XLSX uploads get a summary cover page; photos are already on the form's
+	contact sheet. Returns the names of merged PDFs.
+	"""
+	frozen_form, names, keys = pdf_inputs(form_data, attachments)
+	doc_id = pdf_document_id(frozen_form, names, keys)
+	form_pdf = build_pdf(form_data, names, photo_thumbnails(keys), doc_id)
+	packet = PacketWriter(filename, doc_id)
+	merged = set()
+	try:
+		packet.add_pdf(io.BytesIO(bytes(form_pdf.output())), "Transfer Form", form_pdf.section_pages)
+		for f in attachments or []:
+			info = inspections.get(f.name)
+			if info and info.get("image"):
+				continue
+			if f.name.lower().endswith(".pdf") and (info is None or info["ok"]):
+				try:
+					f.seek(0)
+					packet.add_pdf(f, f.name)
+					merged.add(f.name)
+					continue
+				except Exception as e:
+					print(f"⚠️ Could not merge {f.name}: {e}")
+			packet.add_pdf(io.BytesIO(attachment_cover_pdf(f.name, info)), f"{f.name} (summary)")
+	finally:
+		packet.close()
+		for f in attachments or []:
+			f.seek(0)
+	return merged
+
+
+# =========================================================
+# LIVE PREVIEW — RENDER HELPERS
+# =========================================================
+PREVIEW_DEBOUNCE_S = 0.4   # wait this long after the last edit before re-rendering the PDF
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def render_section_html(section, fields):
+	"""HTML card for one form_data section (cached per section, so only edited sections re-render)."""
+	rows = "".join(
+		f"<tr><td style='color:#1d293d;font-weight:600;padding:2px 10px 2px 0;vertical-align:top;width:38%;'>"
+		f"{html.escape(label)}</td><td style='padding:2px 0;'>{html.escape(value) or '-'}</td></tr>"
+		for label, value in fields
+	)
+	return (
+		"<div style='border:1px solid rgba(128,128,128,0.25);border-radius:6px;padding:8px 12px;margin-bottom:8px;'>"
+		f"<div style='font-weight:700;margin-bottom:4px;'>{html.escape(section)}</div>"
+		f"<table style='width:100%;font-size:13px;border:none;'>{rows}</table></div>"
+	)
+
+
+def queue_preview(frozen_form, attachment_names, photos=()):
+	"""Record the latest form snapshot; the PDF is re-rendered once edits settle."""
+	snapshot = (frozen_form, attachment_names, photos)
+	if st.session_state.get("preview_pending") != snapshot:
+		st.session_state.preview_pending = snapshot
+		st.session_state.preview_changed_at = time.monotonic()
+
+
+@st.fragment(run_every=PREVIEW_DEBOUNCE_S)
+def preview_debouncer():
+	"""Promote the pending snapshot once edits settle; reruns the app only when the preview actually changes."""
+	pending = st.session_state.get("preview_pending")
+	settled = time.monotonic() - st.session_state.get("preview_changed_at", 0) >= PREVIEW_DEBOUNCE_S
+	if pending and settled and pending != st.session_state.get("preview_rendered"):
+		st.session_state.preview_rendered = pending
+		st.rerun()
+		
+		
+def live_pdf_preview():
+	"""Embedded PDF viewer for the last settled snapshot (sent to the browser only on reruns)."""
+	preview_debouncer()
+	shown = st.session_state.get("preview_rendered")
+	if not shown:
+		st.caption("Rendering preview…")
+		return
+	st.pdf(render_pdf_bytes(*shown), height=600)
+
+
 # =========================================================
 # EMAIL
 # =========================================================
@@ -221,9 +1050,203 @@ def send_email(recipient, subject, body, file_path, cc=None):
 		smtp.send_message(msg)
 		
 		
+# =========================================================
+# ATTACHMENT INSPECTION
+# =========================================================
+INSPECT_WORKERS = 4
+INSPECT_TEXT_LIMIT = 2_000_000   # max characters of text extracted per file for classification
+INSPECT_CACHE_MAX = 256          # results kept across sessions (photo results carry their JPEGs)
+IMAGE_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# kind -> (display label, content keywords, sidebar checkbox ticked when found)
+ATTACHMENT_KINDS = {
+	"monitor": ("Monitoring sheet", ("monitoring", "monitor", "body weight", "weight (g)", "clinical score", "score sheet", "bcs"), "chk_monitor"),
+	"cage": ("Cage map", ("cage map", "cage card", "cage id", "rack", "cage"), "chk_cage"),
+	"tumour": ("Tumour curve", ("growth curve", "tumour volume", "tumor volume", "caliper", "mm3", "tumour", "tumor"), "chk_tumour"),
+}
+
+
+@st.cache_resource
+def inspection_pool():
+	"""Thread pool shared by all sessions for upload inspection."""
+	return ThreadPoolExecutor(max_workers=INSPECT_WORKERS, thread_name_prefix="inspect")
+
+
+@st.cache_resource
+def image_pool():
+	"""
+	Process pool shared by all sessions for photo decoding and re-encoding (CPU-bound).
+	Workers are spawned rather than forked, since forking a process that is running
+	Streamlit's server threads can deadlock. A spawned worker re-imports the
+	`streamlit` launcher as __mp_main__ (which does nothing on import), never this
+	script; process_image lives in image_tools.py, which has no Streamlit imports.
+	"""
+	return ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+@st.cache_resource
+def inspection_cache():
+	"""sha256 -> inspection result, shared by all sessions."""
+	return {}
+
+
+def cache_inspection(result):
+	"""Store a finished inspection, evicting the oldest entries past INSPECT_CACHE_MAX."""
+	cache = inspection_cache()
+	cache[result["sha256"]] = result
+	while len(cache) > INSPECT_CACHE_MAX:
+		cache.pop(next(iter(cache)), None)
+
+
+def _xml_text(xml_bytes):
+	return re.sub(r"<[^>]+>", " ", xml_bytes.decode("utf-8", "ignore"))
+
+
+def _inspect_pdf(data):
+	head = data[:1024]
+	if b"%PDF-" not in head:
+		raise ValueError("missing %PDF header")
+	if b"%%EOF" not in data[-2048:]:
+		raise ValueError("truncated PDF (no %%EOF marker)")
+		
+	reader = PdfReader(io.BytesIO(data))
+	if reader.is_encrypted:
+		reader.decrypt("")   # owner-password-only PDFs still open; others fail in extract_text
+		
+	# Extract text page by page (handles hex strings, TJ arrays and font encodings)
+	chunks, extracted = [], 0
+	for page in reader.pages:
+		chunk = page.extract_text() or ""
+		chunks.append(chunk[:INSPECT_TEXT_LIMIT - extracted])
+		extracted += len(chunk)
+		if extracted >= INSPECT_TEXT_LIMIT:
+			break
+	return " ".join(chunks), {"pages": len(reader.pages)}
+
+
+def _inspect_docx(zf):
+	text = _xml_text(zf.read("word/document.xml")[:INSPECT_TEXT_LIMIT])
+	pages = None
+	if "docProps/app.xml" in zf.namelist():
+		m = re.search(rb"<Pages>(\d+)</Pages>", zf.read("docProps/app.xml"))
+		pages = int(m.group(1)) if m else None
+	return text, {"pages": pages}
+
+
+def _inspect_xlsx(zf):
+	workbook = zf.read("xl/workbook.xml")
+	sheet_names = [n.decode("utf-8", "ignore") for n in re.findall(rb'<sheet\b[^>]*\bname="([^"]*)"', workbook)]
+	text = " ".join(sheet_names)
+	if "xl/sharedStrings.xml" in zf.namelist():
+		text += " " + _xml_text(zf.read("xl/sharedStrings.xml")[:INSPECT_TEXT_LIMIT])
+	return text, {"sheets": len(sheet_names)}
+
+
+def inspect_bytes(data, ext, digest):
+	"""Check file structure, count pages/sheets and score content per attachment kind (runs in the pool)."""
+	result = {"sha256": digest, "size": len(data), "ok": True, "error": None, "pages": None, "sheets": None, "scores": {}, "image": None}
+	try:
+		if ext == "pdf":
+			text, counts = _inspect_pdf(data)
+		else:
+			member = {"docx": "word/document.xml", "xlsx": "xl/workbook.xml"}.get(ext)
+			with zipfile.ZipFile(io.BytesIO(data)) as zf:   # raises if the central directory is missing
+				if member not in zf.namelist():
+					raise ValueError(f"not a valid .{ext} (missing {member})")
+				text, counts = _inspect_docx(zf) if ext == "docx" else _inspect_xlsx(zf)
+		result.update(counts)
+		text = text.lower()
+		result["scores"] = {kind: sum(text.count(k) for k in keywords) for kind, (_, keywords, _) in ATTACHMENT_KINDS.items()}
+	except Exception as e:   # uploads are untrusted: any parser failure means the file is unreadable
+		result.update(ok=False, error=str(e) or e.__class__.__name__)
+	cache_inspection(result)
+	return result
+
+
+def classify_attachment(result, name):
+	"""Pick the attachment kind from content scores, with the filename as a tie-breaker."""
+	if name.rsplit(".", 1)[-1].lower() in IMAGE_EXTS:
+		return dict(result, name=name, kind="photo")
+	lowered = name.lower()
+	scores = {
+		kind: result["scores"].get(kind, 0) + (5 if any(k in lowered for k in keywords) else 0)
+		for kind, (_, keywords, _) in ATTACHMENT_KINDS.items()
+	}
+	kind = max(scores, key=scores.get) if scores else None
+	return dict(result, name=name, kind=kind if kind and scores[kind] else "other")
+
+
+def upload_digest(f):
+	"""sha256 of an upload, computed once per file per session."""
+	digests = st.session_state.setdefault("upload_digests", {})
+	file_key = getattr(f, "file_id", None) or (f.name, f.size)
+	if file_key not in digests:
+		digests[file_key] = hashlib.sha256(f.getvalue()).hexdigest()
+	return digests[file_key]
+
+
+def inspect_uploads(files):
+	"""
+	Start (or reuse) background inspection of each upload.
+	Returns {filename: classified result, or None while still running}.
+	"""
+	cache = inspection_cache()
+	jobs = st.session_state.setdefault("inspect_jobs", {})
+	results = {}
+	for f in files or []:
+		digest = upload_digest(f)
+		
+		if digest not in cache and digest not in jobs:
+			ext = f.name.rsplit(".", 1)[-1].lower()
+			if ext in IMAGE_EXTS:
+				jobs[digest] = image_pool().submit(process_image, f.getvalue(), digest)
+				jobs[digest].add_done_callback(lambda job: job.exception() or cache_inspection(job.result()))
+			else:
+				jobs[digest] = inspection_pool().submit(inspect_bytes, f.getvalue(), ext, digest)
+		job = jobs.get(digest)
+		if digest in cache or job.done():
+			jobs.pop(digest, None)
+			result = cache.get(digest)
+			if result is None and job.exception():
+				is_image = f.name.rsplit(".", 1)[-1].lower() in IMAGE_EXTS
+				if is_image and isinstance(job.exception(), BrokenProcessPool):
+					# A worker process died (e.g. out of memory); replace the pool for the next upload
+					image_pool().shutdown(wait=False, cancel_futures=True)
+					image_pool.clear()
+				result = {"sha256": digest, "size": f.size, "ok": False,
+					"error": f"could not {'process image' if is_image else 'inspect file'} ({job.exception()})",
+					"pages": None, "sheets": None, "scores": {}, "image": None}
+				cache_inspection(result)
+			results[f.name] = classify_attachment(result or job.result(), f.name)
+		else:
+			results[f.name] = None
+	return results
+
+
+def tick_checklist(results):
+	"""Tick the sidebar checklist once per newly classified file (manual unticks are respected)."""
+	ticked = st.session_state.setdefault("auto_ticked", set())
+	for r in results.values():
+		if r and r["ok"] and r["kind"] in ATTACHMENT_KINDS and r["sha256"] not in ticked:
+			st.session_state[ATTACHMENT_KINDS[r["kind"]][2]] = True
+			ticked.add(r["sha256"])
+
+
+@st.fragment(run_every=0.5)
+def inspection_watcher():
+	"""Poll pending inspections and rerun the app once they are all finished."""
+	jobs = st.session_state.get("inspect_jobs", {})
+	if jobs and all(job.done() for job in jobs.values()):
+		st.rerun()
+
+
 # =========================================================
 # UI — SIDEBAR UPLOAD + CHECKLIST
 # =========================================================
+# Inspect uploads before the checklist is drawn so it can tick itself
+st.session_state.inspections = inspect_uploads(with_draft_uploads(st.session_state.get(uploader_key("file_uploader")), "draft_uploads"))
+tick_checklist(st.session_state.inspections)
+
 #st.sidebar.image(logo, width='stretch')
 st.sidebar.write("📎 Mandatory attachments:")
 # Sidebar branding
@@ -260,10 +1283,38 @@ st.sidebar.markdown(
 
 uploaded_files = st.sidebar.file_uploader(
 	"Upload attachments",
-	type=["pdf","docx","xlsx"],
+	type=["pdf","docx","xlsx", *IMAGE_EXTS],
 	accept_multiple_files=True,
-	key="file_uploader"
+	key=uploader_key("file_uploader")
 )
+uploaded_files = with_draft_uploads(uploaded_files, "draft_uploads")
+
+
+def drop_draft_upload(state_key, file_id):
+	st.session_state[state_key] = [f for f in st.session_state.get(state_key) or [] if f.file_id != file_id]
+	
+	
+for f in st.session_state.get("draft_uploads") or []:
+	st.sidebar.button(f"✕ {f.name} (from draft)", key=f"drop_{f.file_id}", on_click=drop_draft_upload, args=("draft_uploads", f.file_id), help="Remove this attachment restored from your draft")
+
+for name, r in st.session_state.inspections.items():
+	if r is None:
+		st.sidebar.caption(f"⏳ {name} — inspecting…")
+	elif not r["ok"]:
+		st.sidebar.error(f"⚠️ {name} — file looks corrupt: {r['error']}")
+	elif r["image"]:
+		st.sidebar.caption(f"🖼️ {name} — Photo · {r['image']['width']}×{r['image']['height']}")
+	else:
+		label = ATTACHMENT_KINDS[r["kind"]][0] if r["kind"] in ATTACHMENT_KINDS else "Other document"
+		counts = f"{r['pages']} pages" if r["pages"] else f"{r['sheets']} sheets" if r["sheets"] else ""
+		st.sidebar.caption(f"✅ {name} — {label}" + (f" · {counts}" if counts else ""))
+		
+if any(r is None for r in st.session_state.inspections.values()):
+	inspection_watcher()
+	
+session_heartbeat()
+if SHOW_MEMORY_GAUGE:
+	st.sidebar.caption(f"🧮 Session memory: {total_session_bytes / 1e6:.1f} MB across {session_count} session(s)")
 
 
 st.markdown(
@@ -406,6 +1457,276 @@ if password.lower().strip() not in [u.lower() for u in st.session_state.allowed_
 	st.warning("Access restricted. Please enter a valid key to continue.")
 	st.stop()
 st.sidebar.success(f"✅ Access granted to {password.strip()}")	
+st.session_state.draft_owner = draft_owner(password)
+
+# =========================================================
+# FORM SCHEMA — one definition drives widgets, PDF, email and storage
+# =========================================================
+# Each field: output "label", storage "column", and either a widget "key" (with
+# widget type/args) or nothing, in which case the value is derived in the form
+# code and passed to FORM.collect(). "format" converts the raw widget value.
+FORM_SCHEMA = (
+	{
+		"section": "General Info",
+		"heading": "📋 General Information",
+		"fields": (
+			{"label": "Requester", "column": "requester", "key": "req", "widget": "text", "widget_label": "Requester Name",
+			 "args": {"placeholder": "e.g., Your Name"}, "required": True},
+			{"label": "Requester Email", "column": "requester_email", "key": "req_email", "widget": "text",
+			 "args": {"placeholder": "e.g., your.name@ubc.ca"}, "required": True, "check": "email"},
+			{"label": "Facility", "column": "facility", "key": "inst", "widget": "text",
+			 "args": {"placeholder": "e.g., BC Cancer"}, "required": True},
+			{"label": "Lab Group", "column": "lab_group", "key": "lab", "widget": "text",
+			 "args": {"placeholder": "e.g., PI Lab"}},
+			{"label": "ACC Protocol", "column": "acc_protocol", "key": "prot", "widget": "text",
+			 "args": {"placeholder": "e.g., A25-0001"}, "required": True},
+			{"label": "Requested Transfer Date", "column": "transfer_date", "key": "transfer_date", "widget": "date",
+			 "format": fmt_date},
+			{"label": "Comments", "column": "comments", "key": "com", "widget": "textarea", "widget_label": "Additional Comments",
+			 "args": {"placeholder": (
+				"Add any relevant notes about the animals, scheduling, or experimental context. "
+				"e.g., 'After 10 days no tumours are yet visible but expected to appear soon.' "
+				"You may also note logistical details such as 'Transfer timing may vary ±1 day "
+				"depending on facility staff availability.'"
+			 )}},
+		),
+	},
+	{
+		"section": "Animal Info",
+		"heading": "🐁 Animal Information",
+		"fields": (
+			{"label": "Strain", "column": "strain", "key": "strain", "widget": "text",
+			 "args": {"placeholder": "e.g., C57BL/6J"}, "required": True},
+			{"label": "Number of Animals", "column": "animals", "key": "qty", "widget": "number",
+			 "args": {"min_value": 1, "step": 1}},
+			{"label": "Sex", "column": "sex", "key": "sex", "widget": "select",
+			 "args": {"options": ["Male", "Female", "Both"]}},
+			{"label": "Age at Transfer", "column": "age_at_transfer"},
+			{"label": "DOB Entries", "column": "dob_entries"},
+			{"label": "Cages", "column": "cages"},
+			{"label": "Tumour-bearing", "column": "tumour_bearing"},
+		),
+	},
+	# Rows depend on the imported cage-card CSV (one per sex); omitted when empty
+	{"section": "Cohorts", "heading": "🐁 Cohorts", "dynamic": "cohorts"},
+	{
+		"section": "Tumour Info",
+		"heading": "⚠️ Tumour Information",
+		"when": "tumour_toggle",
+		"fields": (
+			{"label": "Cell Line", "column": "cell_line", "key": "t_cellline", "widget": "text",
+			 "args": {"placeholder": "e.g., AR42J - rat pancreatic tumor cell line - https://www.atcc.org/products/crl-1492"}},
+			{"label": "Tumour Location", "column": "tumour_location", "key": "t_location", "widget": "text",
+			 "widget_label": "Via / Tumour Location",
+			 "args": {"placeholder": "e.g., SQ / Left flank",
+				"help": "Enter both the inoculation route and anatomical site (e.g., SQ / Left flank, IV / Lungs)."}},
+			{"label": "Inoculation Date", "column": "inoculation_date", "key": "t_inocdate", "widget": "date",
+			 "format": fmt_date},
+			{"label": "Tumour Duration", "column": "tumour_duration"},
+			{"label": "Current Tumour Volume", "column": "tumour_volume", "key": "t_volume", "widget": "text",
+			 "widget_label": "Current Tumour Volume (mm³)",
+			 "args": {"placeholder": "e.g., ~325 mm³ (range 280–390 mm³)", "help": "If multiple animals, include a range."}},
+			{"label": "Monitoring Frequency", "column": "monitoring_frequency", "key": "t_monitor", "widget": "text",
+			 "args": {"placeholder": "e.g., Twice weekly (Mon/Thu); increase to daily if rapid tumour growth observed",
+				"help": "Specify the monitoring schedule (e.g., Mon/Thu). Include any adjustments when tumour growth accelerates or approaches the humane endpoint."}},
+			{"label": "Tumour-related Notes", "column": "tumour_notes", "key": "t_notes", "widget": "textarea",
+			 "args": {
+				"placeholder": (
+					"Include tumour growth rate (e.g., doubling every 24 h), condition, grooming, mobility, "
+					"ulceration status, or any signs of distress."
+				),
+				"help": (
+					"Describe tumour progression and general health observations, including growth rate, behaviour, "
+					"and ulceration status. If ulceration is permitted under your approved protocol, specify the "
+					"corresponding humane endpoints (e.g., immediate monitoring and euthanasia criteria)."
+				),
+			 }},
+		),
+	},
+	{
+		"section": "Humane Endpoints",
+		"heading": "🩺 Humane Endpoints",
+		"fields": (
+			{"label": "Weight Loss Limit (%)", "column": "weight_loss_limit", "key": "wloss", "widget": "text",
+			 "args": {"placeholder": "e.g., ≥ 20%"}},
+			{"label": "Tumour Volume Limit (mm³)", "column": "tumour_volume_limit", "key": "tlimit", "widget": "text",
+			 "args": {"placeholder": "e.g., max 1500 mm³"}},
+			{"label": "Signs of Distress", "column": "signs_of_distress", "key": "distress", "widget": "textarea",
+			 "args": {
+				"placeholder": (
+					"e.g., ruffled fur, reduced mobility, hunched posture, lack of grooming, weight loss, "
+					"decreased food or water intake, laboured breathing, lethargy, isolation from cage mates, "
+					"abnormal vocalization, self-mutilation, or ulceration."
+				),
+				"help": (
+					"List any clinical or behavioural signs that may indicate pain, discomfort, or distress. "
+					"Examples: ruffled fur, hunched posture, reduced mobility, lack of grooming, "
+					"weight loss, laboured breathing, dehydration, isolation, abnormal vocalization, "
+					"self-mutilation, or ulceration at the tumour site."
+				),
+			 }},
+		),
+	},
+)
+
+WIDGET_TYPES = {
+	"text": st.text_input,
+	"textarea": st.text_area,
+	"number": st.number_input,
+	"select": st.selectbox,
+	"date": st.date_input,
+}
+FIELD_CHECKS = {
+	"email": (re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+").fullmatch, "is not a valid email address"),
+}
+
+
+def _blank(value):
+	return value is None or str(value).strip() in ("", "-")
+
+
+def _email_value(value):
+	return "-" if _blank(value) else html.escape(str(value))
+
+
+def _text_value(value):
+	return "-" if _blank(value) else str(value)
+
+
+@st.cache_resource
+def compile_form_schema():
+	"""
+	Compile FORM_SCHEMA once per server into specialized renderers: form_data
+	collection, HTML/text email sections, storage rows and validators.
+	"""
+	widgets, collectors, columns, validators = {}, [], [], []
+	email_templates, text_templates, headings = {}, {}, {}
+	
+	for spec in FORM_SCHEMA:
+		section = spec["section"]
+		headings[section] = spec["heading"]
+		if "dynamic" in spec:
+			collectors.append((section, None, spec["dynamic"], ()))
+			continue
+			
+		getters = []
+		for f in spec["fields"]:
+			fmt = f.get("format", lambda v: v)
+			if "key" in f:
+				widgets[f["key"]] = f
+				getters.append((f["label"], lambda state, derived, k=f["key"], fmt=fmt: fmt(state.get(k))))
+			else:
+				getters.append((f["label"], lambda state, derived, c=f["column"], fmt=fmt: fmt(derived.get(c))))
+			columns.append((f["column"], section, f["label"]))
+			if f.get("required"):
+				validators.append((section, f["label"], lambda v: not _blank(v), "is required"))
+			if f.get("check"):
+				check, message = FIELD_CHECKS[f["check"]]
+				validators.append((section, f["label"], lambda v, check=check: _blank(v) or bool(check(str(v).strip())), message))
+		collectors.append((section, spec.get("when"), None, tuple(getters)))
+		
+		# Pre-rendered templates: only the values are filled in per submission
+		labels = [f["label"].replace("{", "{{").replace("}", "}}") for f in spec["fields"]]
+		email_templates[section] = (
+			f"\t<h3>{spec['heading']}</h3>\n\t<ul>\n"
+			+ "".join(f"\t\t<li><strong>{html.escape(label)}:</strong> {{}}</li>\n" for label in labels)
+			+ "\t</ul>\n"
+		)
+		text_templates[section] = f"{spec['heading']}\n" + "".join(f"  {label}: {{}}\n" for label in labels)
+		
+	def collect(state, derived):
+		"""Build form_data ({section: {label: value}}) from widget state and derived values."""
+		form_data = {}
+		for section, when, dynamic, getters in collectors:
+			if dynamic:
+				if derived.get(dynamic):
+					form_data[section] = dict(derived[dynamic])
+			elif when and not state.get(when):
+				form_data[section] = {}
+			else:
+				form_data[section] = {label: get(state, derived) for label, get in getters}
+		return form_data
+	
+	def email_sections(form_data):
+		"""HTML <h3>/<ul> blocks for every non-empty section."""
+		parts = []
+		for section, fields in form_data.items():
+			if not fields:
+				continue
+			template = email_templates.get(section)
+			if template and len(fields) == template.count("{}"):
+				parts.append(template.format(*map(_email_value, fields.values())))
+			else:
+				items = "".join(f"\t\t<li><strong>{html.escape(str(k))}:</strong> {_email_value(v)}</li>\n" for k, v in fields.items())
+				parts.append(f"\t<h3>{headings.get(section, html.escape(section))}</h3>\n\t<ul>\n{items}\t</ul>\n")
+		return "\n".join(parts)
+	
+	def text_sections(form_data):
+		"""Plain-text equivalent of email_sections()."""
+		parts = []
+		for section, fields in form_data.items():
+			if not fields:
+				continue
+			template = text_templates.get(section)
+			if template and len(fields) == template.count("{}"):
+				parts.append(template.format(*map(_text_value, fields.values())))
+			else:
+				parts.append(f"{headings.get(section, section)}\n" + "".join(f"  {k}: {_text_value(v)}\n" for k, v in fields.items()))
+		return "\n".join(parts)
+	
+	def storage_row(form_data):
+		"""Flatten form_data into {column: value} for storage and reporting."""
+		return {column: form_data.get(section, {}).get(label) for column, section, label in columns}
+	
+	def validate(form_data):
+		"""List of human-readable problems (empty when the form is complete)."""
+		return [
+			f"{label} {message}"
+			for section, label, ok, message in validators
+			if section in form_data and form_data[section] and not ok(form_data[section].get(label))
+		]
+		
+	return SimpleNamespace(
+		widgets=widgets,
+		columns=tuple(c for c, _, _ in columns),
+		column_labels={c: label for c, _, label in columns},
+		collect=collect,
+		email_sections=email_sections,
+		text_sections=text_sections,
+		storage_row=storage_row,
+		validate=validate,
+	)
+
+
+FORM = compile_form_schema()
+
+
+def form_widget(key):
+	"""Draw the widget for a schema field; label, placeholder and help come from FORM_SCHEMA."""
+	f = FORM.widgets[key]
+	return WIDGET_TYPES[f["widget"]](f.get("widget_label", f["label"]), key=key, disabled=disable(), **f.get("args", {}))
+
+
+# ---- Draft for this session: pick up the one in the URL (reloaded tab / expired session) or start a new one ----
+if "draft_id" not in st.session_state and not st.session_state.locked:
+	requested = st.query_params.get("draft")
+	stored = load_draft(st.session_state.draft_owner, requested) if requested else {}
+	if stored:
+		restore_draft(st.session_state.draft_owner, requested, stored)
+	st.session_state.draft_id = uuid.uuid4().hex[:12]
+	st.query_params["draft"] = st.session_state.draft_id
+	
+if st.session_state.get("draft_notice"):
+	st.info(st.session_state.pop("draft_notice"))
+	
+other_drafts = [d for d in list_drafts(st.session_state.draft_owner) if d[0] != st.session_state.get("draft_id")][:DRAFT_RECENT]
+if other_drafts and not st.session_state.locked:
+	with st.sidebar.expander("📝 Saved drafts"):
+		for other_id, updated_at, prot in other_drafts:
+			label = f"{datetime.fromtimestamp(updated_at):%b %d, %H:%M}" + (f" · {json.loads(prot)}" if prot and json.loads(prot) else "")
+			if st.button(label, key=f"resume_{other_id}", help="Resume this draft (replaces the current form)"):
+				restore_draft(st.session_state.draft_owner, other_id)
+
 
 # =========================================================
 # MAIN FORM
@@ -418,31 +1739,214 @@ def disable():
 	return st.session_state.locked
 
 # General
-requester = st.text_input("Requester Name", placeholder="e.g., Your Name", key="req", disabled=disable())
-requester_email = st.text_input("Requester Email", placeholder="e.g., your.name@ubc.ca", key="req_email", disabled=disable())
+requester = form_widget("req")
+requester_email = form_widget("req_email")
 facility_email = st.text_input("Facility Manager Email", placeholder="e.g., ccm@ubc.ca", key="fac_email", disabled=disable())
-lab_group = st.text_input("Lab Group", placeholder="e.g., PI Lab", key="lab", disabled=disable())
-protocol = st.text_input("ACC Protocol", placeholder="e.g., A25-0001", key="prot", disabled=disable())
-Facility = st.text_input("Facility", placeholder="e.g., BC Cancer", key="inst", disabled=disable())
-transfer_date = st.date_input("Requested Transfer Date", disabled=disable())
-# Format transfer date nicely for display
-transfer_date_str = transfer_date.strftime("%b %d, %Y")  # e.g. "Nov 10, 2025"
-
-comments = st.text_area("Additional Comments", placeholder=(
-	"Add any relevant notes about the animals, scheduling, or experimental context. "
-	"e.g., 'After 10 days no tumours are yet visible but expected to appear soon.' "
-	"You may also note logistical details such as 'Transfer timing may vary ±1 day "
-	"depending on facility staff availability.'"
-), key="com", disabled=disable())
+lab_group = form_widget("lab")
+protocol = form_widget("prot")
+Facility = form_widget("inst")
+transfer_date = form_widget("transfer_date")
+comments = form_widget("com")
 
 # Animal info
-strain = st.text_input("Strain", placeholder="e.g., C57BL/6J", key="strain", disabled=disable())
-quantity = st.number_input("Number of Animals", min_value=1, step=1, key="qty", disabled=disable())
-gender = st.selectbox("Sex", ["Male", "Female", "Both"], key="sex", disabled=disable())
+strain = form_widget("strain")
+quantity = form_widget("qty")
+gender = form_widget("sex")
+
+# ======= Cage number parsing (helpers) =======
+MAX_CAGE_RANGE = 10_000   # refuse ranges longer than this (likely a typo)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def parse_cages(text):
+	"""
+	Normalize free-text cage numbers (lists, ranges like 563740-563760 or 563740-60, mixed separators).
+	Returns {"cages": sorted unique ints, "duplicates": sorted ints, "malformed": [tokens]}.
+	"""
+	seen, duplicates, malformed = set(), set(), []
+	text = re.sub(r"\s*(?:-|–|—|\bto\b)\s*", "-", text or "", flags=re.I)
+	for token in re.split(r"[,;/\s]+", text.strip()):
+		token = token.strip("#.")
+		if not token:
+			continue
+		m = re.fullmatch(r"(\d+)(?:-(\d+))?", token)
+		if not m:
+			malformed.append(token)
+			continue
+		start, end = m.group(1), m.group(2) or m.group(1)
+		if len(end) < len(start):   # shorthand: 563740-60 -> 563740-563760
+			end = start[:len(start) - len(end)] + end
+		lo, hi = int(start), int(end)
+		if hi < lo or hi - lo >= MAX_CAGE_RANGE:
+			malformed.append(token)
+			continue
+		block = range(lo, hi + 1)
+		duplicates.update(seen.intersection(block))
+		seen.update(block)
+	return {"cages": sorted(seen), "duplicates": sorted(duplicates), "malformed": malformed}
+
+
+def format_cages(cages):
+	"""Compact sorted cage numbers back into ranges: 1, 2, 3, 7 -> "1-3, 7"."""
+	parts, i = [], 0
+	while i < len(cages):
+		j = i
+		while j + 1 < len(cages) and cages[j + 1] == cages[j] + 1:
+			j += 1
+		parts.append(str(cages[i]) if i == j else f"{cages[i]}-{cages[j]}")
+		i = j + 1
+	return ", ".join(parts)
+
+
+def cage_registry_mtime():
+	"""Registry file modification time (part of the cache key so edits are picked up)."""
+	try:
+		return CAGE_REGISTRY_FILE.stat().st_mtime
+	except OSError:
+		return None
+
+
+@st.cache_resource(show_spinner=False)
+def load_cage_registry(path, mtime):
+	"""
+	Load the cage registry (cage number in the first column) once into a hashed
+	set for O(1) lookups. Returns None if there is no registry file.
+	"""
+	if mtime is None:
+		return None
+	with open(path, newline="", encoding="utf-8-sig") as f:
+		return frozenset(int(row[0].strip()) for row in csv.reader(f) if row and row[0].strip().isdigit())
+
+
+# ======= Cage-card cohort import (helpers) =======
+# Accepted header spellings for each cage-card CSV column
+COHORT_COLUMNS = {
+	"cage": ("cage", "cage id", "cage_id", "cage number", "cage no", "cage #"),
+	"dob": ("dob", "date of birth", "birth date", "birthdate", "born"),
+	"sex": ("sex", "gender"),
+	"count": ("count", "n", "animals", "number", "qty", "quantity"),
+}
+# Accepted DOB formats, tried in order: ISO first, then day-first (the local convention)
+COHORT_DOB_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d %b %Y", "%d-%b-%Y", "%d %B %Y", "%b %d, %Y")
+
+
+def parse_dobs(values):
+	"""
+	Parse DOB strings with COHORT_DOB_FORMATS (no format guessing).
+	Returns (dates, ambiguous) where ambiguous marks numeric day-first dates that would
+	also read as a different month-first date (e.g. 03/04/2025).
+	"""
+	values = values.fillna("").str.strip()
+	dob = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+	ambiguous = pd.Series(False, index=values.index)
+	for fmt in COHORT_DOB_FORMATS:
+		todo = dob.isna()
+		if not todo.any():
+			break
+		parsed = pd.to_datetime(values[todo], format=fmt, errors="coerce")
+		dob[todo] = parsed
+		if fmt.startswith("%d") and "%m" in fmt:
+			ambiguous[todo] = parsed.notna() & (parsed.dt.day <= 12) & (parsed.dt.day != parsed.dt.month)
+	return dob, ambiguous
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def load_cohort_csv(data, transfer_date):
+	"""
+	Parse a cage-card CSV (cage, DOB, sex, count); DOBs after `transfer_date` are rejected.
+	Returns (clean DataFrame, {reason: [cage IDs of skipped rows]}, [cages with an ambiguous DOB]).
+	"""
+	raw = pd.read_csv(io.BytesIO(data), dtype=str, skipinitialspace=True)
+	lookup = {alias: col for col, aliases in COHORT_COLUMNS.items() for alias in aliases}
+	raw = raw.rename(columns=lambda c: lookup.get(str(c).strip().lower(), c))
+	missing = [c for c in ("cage", "dob") if c not in raw.columns]
+	if missing:
+		raise ValueError(f"missing column(s): {', '.join(missing)}")
+		
+	dob, ambiguous = parse_dobs(raw["dob"])
+	df = pd.DataFrame({
+		"cage": raw["cage"].str.strip(),
+		"dob": dob,
+		"sex": (raw["sex"] if "sex" in raw else pd.Series("", index=raw.index))
+			.fillna("").str.strip().str[:1].str.upper().map({"M": "Male", "F": "Female"}).fillna("Unknown"),
+		"count": pd.to_numeric(raw["count"], errors="coerce") if "count" in raw else 1.0,
+	})
+	# Rows without a cage ID are reported by their CSV line number (line 1 is the header)
+	labels = df["cage"].where(df["cage"].fillna("") != "", "line " + (raw.index + 2).astype(str))
+	checks = {
+		"missing cage ID": df["cage"].fillna("") != "",
+		"unreadable DOB": df["dob"].notna(),
+		"DOB after transfer date": df["dob"] <= pd.Timestamp(transfer_date),
+		"count not a positive whole number": (df["count"] > 0) & (df["count"] % 1 == 0),
+	}
+	skipped, valid = {}, pd.Series(True, index=df.index)
+	for reason, ok in checks.items():
+		if (valid & ~ok).any():
+			skipped[reason] = labels[valid & ~ok].tolist()
+		valid &= ok
+	df = df[valid].astype({"count": int}).reset_index(drop=True)
+	return df, skipped, labels[valid & ambiguous].tolist()
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def cohort_stats(df, transfer_date):
+	"""
+	Ages at transfer for every animal in one vectorized pass.
+	Returns (per-sex summary, weekly age histogram, overall summary dict).
+	"""
+	age_w = (pd.Timestamp(transfer_date) - df["dob"]).dt.days.to_numpy() / 7
+	counts = df["count"].to_numpy()
+	animals = pd.DataFrame({"sex": np.repeat(df["sex"].to_numpy(), counts), "age_w": np.repeat(age_w, counts)})
+	
+	summary = animals.groupby("sex")["age_w"].agg(["mean", "median", "min", "max"]).round(1)
+	summary.insert(0, "animals", animals.groupby("sex").size())
+	summary.insert(0, "cages", df.groupby("sex")["cage"].nunique())
+	
+	histogram = pd.crosstab(np.floor(animals["age_w"]).astype(int), animals["sex"])
+	histogram.index.name = "age (weeks)"
+	
+	overall = {
+		"cages": int(df["cage"].nunique()),
+		"animals": int(counts.sum()),
+		"min": round(float(age_w.min()), 1),
+		"max": round(float(age_w.max()), 1),
+		"mean": round(float(animals["age_w"].mean()), 1),
+		"median": round(float(animals["age_w"].median()), 1),
+		"dob_min": df["dob"].min().date(),
+		"dob_max": df["dob"].max().date(),
+	}
+	return summary, histogram, overall
+
 
 # ======= Animal Age Section =======
 st.subheader("Animal Age")
 
+cohort_file = st.file_uploader(
+	"Import cage cards (CSV, optional)",
+	type=["csv"],
+	key=uploader_key("cohort_csv"),
+	disabled=disable(),
+	help="One row per cage with columns: cage, DOB (YYYY-MM-DD or DD/MM/YYYY), sex, count. Use this instead of the DOB fields for large colonies."
+)
+cohort_files = with_draft_uploads(cohort_file, "draft_cohort")
+cohort_file = cohort_files[0] if cohort_files else None
+if isinstance(cohort_file, SpooledUpload) and not disable():
+	st.button(f"✕ {cohort_file.name} (from draft)", key=f"drop_{cohort_file.file_id}", on_click=drop_draft_upload, args=("draft_cohort", cohort_file.file_id))
+cohort_df, cohort_summary, cohort_overall = None, None, None
+if cohort_file is not None:
+	try:
+		cohort_df, skipped, ambiguous = load_cohort_csv(cohort_file.getvalue(), transfer_date)
+		if skipped:
+			st.warning("⚠️ Rows skipped:\n" + "\n".join(f"- {reason}: {', '.join(cages)}" for reason, cages in skipped.items()))
+		if cohort_df.empty:
+			st.error("No valid rows found in the cage-card CSV.")
+			cohort_df = None
+		elif ambiguous:
+			st.info(f"📅 DOBs read as day/month (please check): {', '.join(ambiguous)}")
+	except (ValueError, pd.errors.ParserError) as e:
+		st.error(f"Could not read cage-card CSV: {e}")
+		cohort_df = None
+		
 # Track how many DOB fields are shown
 if "dob_fields" not in st.session_state:
 	st.session_state.dob_fields = 1
@@ -452,50 +1956,92 @@ def add_dob_field():
 	if st.session_state.dob_fields < 3:
 		st.session_state.dob_fields += 1
 		
-# DOB inputs based on how many active fields
-dob_inputs = []
-for i in range(st.session_state.dob_fields):
-	dob = st.date_input(
-		f"DOB (Group {i+1})",
-		key=f"dob{i+1}",
-		disabled=disable()
-	)
-	dob_inputs.append(dob)
-	
-# Button to add another DOB
-if st.session_state.dob_fields < 3 and not disable():
-	st.button("➕ Add another DOB", on_click=add_dob_field)
-	
 # --- Calculate ages ---
 def calc_age_weeks(dob):
 	if dob:
 		return round((transfer_date - dob).days / 7, 1)
 	return None
 
-ages = list(filter(None, [calc_age_weeks(d) for d in dob_inputs]))
-
-# Create age text
+dob_inputs = []
 age_range = ""
-if ages:
-	if len(ages) == 1:
-		age_range = f"{ages[0]} weeks"
+if cohort_df is not None:
+	# Imported cohort replaces the per-group DOB widgets
+	cohort_summary, cohort_histogram, cohort_overall = cohort_stats(cohort_df, transfer_date)
+	if cohort_overall["min"] == cohort_overall["max"]:
+		age_range = f"{cohort_overall['min']} weeks"
 	else:
-		age_range = f"{min(ages)} – {max(ages)} weeks"
+		age_range = (
+			f"{cohort_overall['min']} – {cohort_overall['max']} weeks "
+			f"(mean {cohort_overall['mean']}, median {cohort_overall['median']})"
+		)
+	st.dataframe(cohort_summary, width="stretch")
+	st.bar_chart(cohort_histogram, x_label="Age at transfer (weeks)", y_label="Animals")
+	if cohort_overall["animals"] != quantity:
+		st.warning(f"⚠️ The CSV lists {cohort_overall['animals']} animals but Number of Animals is {quantity}.")
+else:
+	# DOB inputs based on how many active fields
+	for i in range(st.session_state.dob_fields):
+		dob = st.date_input(
+			f"DOB (Group {i+1})",
+			key=f"dob{i+1}",
+			disabled=disable()
+		)
+		dob_inputs.append(dob)
+		
+	# Button to add another DOB
+	if st.session_state.dob_fields < 3 and not disable():
+		st.button("➕ Add another DOB", on_click=add_dob_field)
 		
+	ages = [a for a in (calc_age_weeks(d) for d in dob_inputs) if a is not None]
+	
+	# Create age text
+	if ages:
+		if len(ages) == 1:
+			age_range = f"{ages[0]} weeks"
+		else:
+			age_range = f"{min(ages)} – {max(ages)} weeks"
+			
 # Display age range
 if age_range:
 	st.info(f"Estimated Age at Transfer: **{age_range}**")
 else:
 	st.warning("Please enter at least one DOB to calculate age.")
 ############	
-cage_numbers = st.text_area("Cage Numbers", placeholder="e.g., 563742, 563735, 563559", key="cages", disabled=disable())
+cage_numbers = st.text_area(
+	"Cage Numbers",
+	placeholder="e.g., 563742, 563735, 563559 or ranges like 563740-563760",
+	key="cages",
+	disabled=disable()
+)
+
+cage_check = parse_cages(cage_numbers)
+cage_list = cage_check["cages"]
+if cage_list:
+	cage_registry = load_cage_registry(str(CAGE_REGISTRY_FILE), cage_registry_mtime())
+	unknown = [c for c in cage_list if c not in cage_registry] if cage_registry is not None else []
+	
+	st.caption(f"✅ {len(cage_list)} cage(s): {format_cages(cage_list)}")
+	if cage_check["malformed"]:
+		st.warning(f"⚠️ Not a cage number or range (kept as written): {', '.join(cage_check['malformed'][:10])}" + (" …" if len(cage_check["malformed"]) > 10 else ""))
+	if cage_check["duplicates"]:
+		st.warning(f"⚠️ Listed more than once: {format_cages(cage_check['duplicates'])}")
+	if unknown:
+		st.warning(f"⚠️ {len(unknown)} cage(s) not found in the cage registry: {format_cages(unknown[:50])}" + (" …" if len(unknown) > 50 else ""))
+	if len(cage_list) > quantity:
+		st.warning(f"⚠️ {len(cage_list)} cages listed for {quantity} animal(s) — check Number of Animals.")
+	if cohort_df is not None:
+		imported = set(pd.to_numeric(cohort_df["cage"], errors="coerce").dropna().astype(int))
+		if imported != set(cage_list):
+			st.warning(f"⚠️ Cage numbers differ from the imported cage-card CSV ({len(imported)} cages).")
+elif cage_check["malformed"]:
+	st.warning(f"⚠️ Not a cage number or range (kept as written): {', '.join(cage_check['malformed'][:10])}")
 
 # ===============================
 # Tumour Section (if applicable)
 # ===============================
 
 tumour = st.checkbox("Tumour-bearing animals?", key="tumour_toggle", disabled=disable())
-tumour_info = {}
+tumour_duration = "-"
 
 if tumour:
 	with st.expander("⚠️ Tumour-bearing Animals (required)", expanded=True):
@@ -505,96 +2051,22 @@ if tumour:
 		)
 		
 		
-		tumour_cellline = st.text_input(
-			"Cell Line",
-			placeholder="e.g., AR42J - rat pancreatic tumor cell line - https://www.atcc.org/products/crl-1492",
-			key="t_cellline",
-			disabled=disable()
-		)
-		
-		tumour_location = st.text_input(
-			"Via / Tumour Location",
-			placeholder="e.g., SQ / Left flank",
-			key="t_location",
-			disabled=disable(),
-			help="Enter both the inoculation route and anatomical site (e.g., SQ / Left flank, IV / Lungs)."
-
-		)
-		
-		tumour_inoc_date = st.date_input(
-			"Inoculation Date",
-			key="t_inocdate",
-			disabled=disable()
-		)
-		
-		tumour_volume = st.text_input(
-			"Current Tumour Volume (mm³)",
-			placeholder="e.g., ~325 mm³ (range 280–390 mm³)",
-			key="t_volume",
-			disabled=disable(),
-			help="If multiple animals, include a range."
-		
-		)
-		
-		tumour_monitor = st.text_input(
-			"Monitoring Frequency",
-			placeholder="e.g., Twice weekly (Mon/Thu); increase to daily if rapid tumour growth observed",
-			key="t_monitor",
-			disabled=disable(),
-			help="Specify the monitoring schedule (e.g., Mon/Thu). Include any adjustments when tumour growth accelerates or approaches the humane endpoint."
-		)
-		
-		tumour_notes = st.text_area(
-			"Tumour-related Notes",
-			placeholder=(
-				"Include tumour growth rate (e.g., doubling every 24 h), condition, grooming, mobility, "
-				"ulceration status, or any signs of distress."
-			),
-			key="t_notes",
-			disabled=disable(),
-			help=(
-				"Describe tumour progression and general health observations, including growth rate, behaviour, "
-				"and ulceration status. If ulceration is permitted under your approved protocol, specify the "
-				"corresponding humane endpoints (e.g., immediate monitoring and euthanasia criteria)."
-			)
-		)
+		form_widget("t_cellline")
+		form_widget("t_location")
+		tumour_inoc_date = form_widget("t_inocdate")
+		form_widget("t_volume")
+		form_widget("t_monitor")
+		form_widget("t_notes")
 		
 		# ---- Calculate tumour duration ----
-		tumour_duration = "-"
 		if tumour_inoc_date:
-			tumour_duration_days = (transfer_date - tumour_inoc_date).days
-			tumour_duration = f"{tumour_duration_days} days"
-			
-		# ---- Package tumour info for PDF/email ----
-		tumour_info = {
-			"Cell Line": tumour_cellline,
-			"Tumour Location": tumour_location,
-			"Inoculation Date": fmt_date(tumour_inoc_date) if tumour_inoc_date else "-",
-			"Tumour Duration": tumour_duration,
-			"Current Tumour Volume": tumour_volume,
-			"Monitoring Frequency": tumour_monitor,
-			"Notes": tumour_notes,
-         }	
+			tumour_duration = f"{(transfer_date - tumour_inoc_date).days} days"
+			
 # Humane endpoints
 with st.expander("🩺 Humane Endpoints", expanded=False):
-	weight_loss = st.text_input("Weight Loss Limit (%)", placeholder="e.g., ≥ 20%", key="wloss", disabled=disable())
-	tumour_volume_limit = st.text_input("Tumour Vol Limit (mm³)", placeholder="e.g., max 1500 mm³", key="tlimit", disabled=disable())
-	distress_signs=st.text_area(
-		"Signs of Distress",
-		placeholder=(
-			"e.g., ruffled fur, reduced mobility, hunched posture, lack of grooming, weight loss, "
-			"decreased food or water intake, laboured breathing, lethargy, isolation from cage mates, "
-			"abnormal vocalization, self-mutilation, or ulceration."
-		),
-		key="distress",
-		disabled=disable(),
-		help=(
-			"List any clinical or behavioural signs that may indicate pain, discomfort, or distress. "
-			"Examples: ruffled fur, hunched posture, reduced mobility, lack of grooming, "
-			"weight loss, laboured breathing, dehydration, isolation, abnormal vocalization, "
-			"self-mutilation, or ulceration at the tumour site."
-		)
-)
+	form_widget("wloss")
+	form_widget("tlimit")
+	form_widget("distress")
 
 # 💡 Recommendation box (AFTER Humane Endpoints)
 st.info(
@@ -607,6 +2079,58 @@ st.info(
 	
 	
 send_copy = st.checkbox("Send requester a copy", key="copy", disabled=disable())
+send_packet = st.checkbox(
+	"Combine form and PDF attachments into a single packet",
+	key="packet",
+	disabled=disable(),
+	help="Facility staff receive one bookmarked PDF instead of separate files. Word/Excel files are still attached and get a summary page in the packet."
+)
+
+# Package form data (rebuilt on every run so the live preview stays in sync)
+form_data = FORM.collect(st.session_state, {
+	"age_at_transfer": age_range,
+	"dob_entries": (
+		f"{fmt_date(cohort_overall['dob_min'])} – {fmt_date(cohort_overall['dob_max'])} "
+		f"({cohort_overall['cages']} cages imported from {cohort_file.name})"
+		if cohort_overall else ", ".join([fmt_date(d) for d in dob_inputs if d])
+	),
+	# Tokens the parser can't read (e.g. alphanumeric cage-card IDs) are kept verbatim
+	"cages": ", ".join(filter(None, [format_cages(cage_list), *cage_check["malformed"]])),
+	"tumour_bearing": "Yes" if tumour else "No",
+	"tumour_duration": tumour_duration,
+	"cohorts": {
+		sex: (
+			f"{row['cages']} cages, {row['animals']} animals - mean {row['mean']} wk, "
+			f"median {row['median']} wk, range {row['min']}-{row['max']} wk"
+		)
+		for sex, row in cohort_summary.iterrows()
+	} if cohort_summary is not None else {},
+})
+form_errors = FORM.validate(form_data)
+if form_errors and not disable():
+	st.warning("Before submitting, please fix:\n" + "\n".join(f"- {e}" for e in form_errors))
+	
+# Autosave the draft (debounced; only changed fields are written)
+if not disable() and not st.session_state.get("draft_relink"):
+	queue_draft(uploaded_files, [cohort_file] if cohort_file else [])
+	with st.sidebar:
+		draft_autosaver()
+		
+# =========================================================
+# LIVE PREVIEW
+# =========================================================
+if not disable() and st.toggle("👁️ Live preview", key="live_preview"):
+	frozen_form = freeze_form(form_data)
+	attachment_names = tuple(f.name for f in uploaded_files) if uploaded_files else ()
+	queue_preview(frozen_form, attachment_names, photo_keys(uploaded_files))
+	
+	summary_tab, pdf_tab = st.tabs(["Summary", "PDF"])
+	with summary_tab:
+		for section, fields in frozen_form:
+			if fields:
+				st.markdown(render_section_html(section, fields), unsafe_allow_html=True)
+	with pdf_tab:
+		live_pdf_preview()
 
 # =========================================================
 # PREVIEW & SUBMIT WORKFLOW
@@ -629,35 +2153,6 @@ if st.button("📄 Preview PDF", disabled=disable()):
 
 	all_attachments = uploaded_names + checked_items
 	
-	# Package form data
-	form_data = {
-		"General Info": {
-			"Requester": requester,
-			"Requester Email": requester_email,
-			"Facility": Facility,
-			"Lab Group": lab_group,
-			"ACC Protocol": protocol,
-			"Requested Transfer Date": fmt_date(transfer_date),
-			"Comments": comments,
-		},
-		"Animal Info": {
-			"Strain": strain,
-			"Number of Animals": quantity,
-			"Sex": gender,
-			"Age at Transfer": age_range,
-			"DOB Entries": ", ".join([fmt_date(d) for d in dob_inputs if d]),
-			"Cages": cage_numbers,
-			"Tumour-bearing": "Yes" if tumour else "No",
-		},
-		"Tumour Info": tumour_info if tumour else {},
-		"Humane Endpoints": {
-			"Weight Loss Limit (%)": weight_loss,
-			"Tumour V Limit (mm³)": tumour_volume_limit,
-			"Signs of Distress": distress_signs,
-		},
-#		"Attachments": {"Files and Notes": all_attachments},
-	}
-	
 	timestamp = date.today().strftime("%Y%m%d")
 	filename = f"CCM_Transfer_{requester.replace(' ','_')}_{timestamp}.pdf"
 	
@@ -687,16 +2182,17 @@ if st.button("📄 Preview PDF", disabled=disable()):
 	
 	with open(filename, "rb") as f:
 		st.download_button("⬇️ Download PDF", f, file_name=filename, mime="application/pdf")
+	st.caption(f"🔐 SHA-256: {file_sha256(filename)} — the same form always renders to the same bytes.")
 		
 # =========================================================
 # EMAIL — HTML + Attachments
 # =========================================================
 
 
-def send_email(recipient, subject, html_body, file_path, cc=None):
+def build_message(recipient, subject, html_body, file_path, cc=None, merged_names=(), attachments=None, text_body=None):
 		"""
-		Send an HTML-formatted email with attachments (PDF + user uploads).
-		Works with Gmail SMTP (SSL on port 465).
+		Build an HTML-formatted email with attachments (PDF + user uploads).
+		Uploads listed in `merged_names` are already inside the packet PDF and are skipped.
 		"""
 		msg = EmailMessage()
 		msg["Subject"] = subject
@@ -705,7 +2201,9 @@ def send_email(recipient, subject, html_body, file_path, cc=None):
 		if cc:
 				msg["Cc"] = cc
 			
-		# Add HTML body
+		# Plain-text part (if given) plus HTML body
+		if text_body:
+				msg.set_content(text_body)
 		msg.add_alternative(html_body, subtype="html")
 	
 		# Attach the main PDF
@@ -718,45 +2216,52 @@ def send_email(recipient, subject, html_body, file_path, cc=None):
 				)
 			
 		# Attach any uploaded files from sidebar
-		if st.session_state.attachments:
-				for f in st.session_state.attachments:
-						data = f.read()
-						ext = f.name.split(".")[-1].lower()
-						subtype = {
-								"pdf": "pdf",
-								"docx": "vnd.openxmlformats-officedocument.wordprocessingml.document",
-								"xlsx": "vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-						}.get(ext, "octet-stream")
-						msg.add_attachment(
-								data,
-								maintype="application",
-								subtype=subtype,
-								filename=f.name,
-						)
-					
-		with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
+		inspections = st.session_state.get("inspections") or {}
+		for f in attachments or []:
+				if f.name in merged_names:
+						continue
+				ext = f.name.split(".")[-1].lower()
+				image = (inspections.get(f.name) or {}).get("image")
+				if image:
+						# Photos go out as the downscaled, orientation-fixed JPEG unless the original is a smaller JPEG/PNG
+						if len(image["email"]) < f.size or ext in ("heic", "heif"):
+								msg.add_attachment(image["email"], maintype="image", subtype="jpeg", filename=f.name.rsplit(".", 1)[0] + ".jpg")
+						else:
+								msg.add_attachment(f.getvalue(), maintype="image", subtype="png" if ext == "png" else "jpeg", filename=f.name)
+						continue
+				subtype = {
+						"pdf": "pdf",
+						"docx": "vnd.openxmlformats-officedocument.wordprocessingml.document",
+						"xlsx": "vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+				}.get(ext, "octet-stream")
+				msg.add_attachment(
+						f.getvalue(),
+						maintype="application",
+						subtype=subtype,
+						filename=f.name,
+				)
+		return msg
+
+
+def send_messages(messages, timeout=60):
+		"""Send one or more messages over a single Gmail SMTP session (SSL on port 465)."""
+		with smtplib.SMTP_SSL("smtp.gmail.com", 465, timeout=timeout) as smtp:
 				smtp.login(SENDER_EMAIL, APP_PASSWORD)
-				smtp.send_message(msg)
-				print(f"✅ Email sent to {recipient}")
+				for msg in messages:
+						smtp.send_message(msg)
+						print(f"✅ Email sent to {msg['To']}")
+						
+						
 			
 			
 # =========================================================
 # HELPER — Build Beautiful HTML Email Body
 # =========================================================
 
-def build_email_html(
-		transfer_date,
-		tumour,
-		tumour_info,
-		weight_loss,
-		tumour_volume_limit,
-		distress_signs,
-		form_data,
-		attachments=None   
-):
+def build_email_html(form_data, attachments=None, fingerprint=None):
 		"""
-		Build a complete HTML email summary of the mouse transfer,
-		including general info, animal info, tumour, and humane endpoints.
+		Build a complete HTML email summary of the mouse transfer.
+		Section blocks come from the compiled form schema (FORM.email_sections).
 		"""
 	
 		# Convert logo to base64 (inline image)
@@ -767,8 +2272,7 @@ def build_email_html(
 						logo_b64 = base64.b64encode(f.read()).decode("utf-8")
 					
 		gen = form_data.get("General Info", {})
-		animal = form_data.get("Animal Info", {})
-		attach_list = [f.name for f in attachments] if attachments else []
+		attach_list = [html.escape(f.name) for f in attachments] if attachments else []
 	
 		return f"""
 <html>
@@ -811,50 +2315,11 @@ def build_email_html(
 <div class="container">
 	<div style="text-align:center;">
 		{"<img src='data:image/png;base64," + logo_b64 + "' width='120' style='margin-bottom:15px;'/>" if logo_b64 else ""}
-		<h2>Animal Transfer Form — From {gen.get("Facility","-")} to CCM</h2>
-		<p><strong>Date Submitted:</strong> {fmt_date(transfer_date)}</p>
+		<h2>Animal Transfer Form — From {_email_value(gen.get("Facility"))} to CCM</h2>
+		<p><strong>Date Submitted:</strong> {_email_value(gen.get("Requested Transfer Date"))}</p>
 	</div>
 
-	<h3>📋 General Information</h3>
-	<ul>
-		<li><strong>Requester:</strong> {gen.get("Requester","-")}</li>
-		<li><strong>Requester Email:</strong> {gen.get("Requester Email","-")}</li>
-		<li><strong>Lab Group:</strong> {gen.get("Lab Group","-")}</li>
-		<li><strong>ACC Protocol:</strong> {gen.get("ACC Protocol","-")}</li>
-		<li><strong>Facility:</strong> {gen.get("Facility","-")}</li>
-		<li><strong>Requested Transfer Date:</strong> {gen.get("Requested Transfer Date","-")}</li>
-		<li><strong>Comments:</strong> {gen.get("Comments","-")}</li>
-	</ul>
-
-	<h3>🐁 Animal Information</h3>
-	<ul>
-		<li><strong>Strain:</strong> {animal.get("Strain","-")}</li>
-		<li><strong>Number of Animals:</strong> {animal.get("Number of Animals","-")}</li>
-		<li><strong>Sex:</strong> {animal.get("Sex","-")}</li>
-		<li><strong>Age at Transfer:</strong> {animal.get("Age at Transfer","-")}</li>
-		<li><strong>DOB Entries:</strong> {animal.get("DOB Entries","-")}</li>
-		<li><strong>Cages:</strong> {animal.get("Cages","-")}</li>
-		<li><strong>Tumour-bearing:</strong> {animal.get("Tumour-bearing","-")}</li>
-	</ul>
-
-	<h3>⚠️ Tumour Information</h3>
-	<ul>
-		<li><strong>Cell Line:</strong> {tumour_info.get("Cell Line","-")}</li>
-		<li><strong>Tumour Location:</strong> {tumour_info.get("Tumour Location","-")}</li>
-		<li><strong>Inoculation Date:</strong> {tumour_info.get("Inoculation Date","-")}</li>
-		<li><strong>Tumour Duration:</strong> {tumour_info.get("Tumour Duration","-")}</li>
-		<li><strong>Current Tumour Volume:</strong> {tumour_info.get("Current Tumour Volume","-")}</li>
-		<li><strong>Monitoring Frequency:</strong> {tumour_info.get("Monitoring Frequency","-")}</li>
-		<li><strong>Tumour-related Notes:</strong> {tumour_info.get("Notes","-")}</li>
-	</ul>
-
-	<h3>🩺 Humane Endpoints</h3>
-	<ul>
-		<li><strong>Weight Loss Limit (%):</strong> {weight_loss}</li>
-		<li><strong>Tumour V Limit (mm³):</strong> {tumour_volume_limit}</li>
-		<li><strong>Signs of Distress:</strong> {distress_signs}</li>
-	</ul>
-
+{FORM.email_sections(form_data)}
 	<h3>📎 Attachments Summary</h3>
 	<ul class="attachment-list">
 		{''.join(f'<li>{f}</li>' for f in attach_list) if attach_list else '<li>No attachments uploaded.</li>'}
@@ -869,6 +2334,7 @@ def build_email_html(
 			We will contact you directly in case of any questions or clarifications.<br><br>
 			{"A copy has been sent to the requester." if st.session_state.get("copy") else ""}
 		</p>
+		{f"<p style='font-family:monospace;font-size:11px;color:#999;'>Document ID: {fingerprint['document_id']}<br>PDF SHA-256: {fingerprint.get('pdf_sha256', fingerprint.get('packet_sha256'))}</p>" if fingerprint else ""}
 	</div>
 	
 </div>
@@ -876,13 +2342,388 @@ def build_email_html(
 </html>
 """
 
+
+def build_email_text(form_data, attachments=None, fingerprint=None):
+		"""Plain-text alternative of build_email_html()."""
+		names = "\n".join(f"  - {f.name}" for f in attachments) if attachments else "  No attachments uploaded."
+		return (
+				f"Animal Transfer Form — From {_text_value(form_data.get('General Info', {}).get('Facility'))} to CCM\n\n"
+				f"{FORM.text_sections(form_data)}\n"
+				f"📎 Attachments Summary\n{names}\n\n"
+				"This form was automatically generated by the Rodent Transfer Portal — "
+				"Molecular Imaging Research Facility @ UBC.\n"
+				+ (f"\nDocument ID: {fingerprint['document_id']}\nPDF SHA-256: {fingerprint.get('pdf_sha256', fingerprint.get('packet_sha256'))}\n" if fingerprint else "")
+		)
+
+	
+	
+# =========================================================
+# DIGEST MODE — batch non-urgent facility notifications
+# =========================================================
+DIGEST_PERIODS = {"hourly": timedelta(hours=1), "daily": timedelta(days=1)}
+DIGEST_MAX_BYTES = 20 * 1024 * 1024    # split digests to stay under Gmail's 25 MB limit
+URGENT_WITHIN = timedelta(hours=48)
+# Storage columns (see FORM_SCHEMA) shown in the digest summary table
+DIGEST_COLUMNS = ("requester", "lab_group", "acc_protocol", "facility", "transfer_date", "strain", "animals", "sex", "tumour_bearing")
+
+
+def is_urgent(form_data):
+		"""Transfers within 48 h and tumour-bearing animals bypass the digest (judged on the submitted form)."""
+		record = FORM.storage_row(form_data)
+		transfer_at = datetime.strptime(record["transfer_date"], "%b %d, %Y")
+		return record["tumour_bearing"] == "Yes" or transfer_at - datetime.now() <= URGENT_WITHIN
+
+
+def next_digest_due(now):
+		"""Top of the next hour (hourly) or the next DIGEST_HOUR:00 (daily)."""
+		if DIGEST_MODE == "hourly":
+				return now.replace(minute=0, second=0, microsecond=0) + DIGEST_PERIODS["hourly"]
+		due = now.replace(hour=DIGEST_HOUR, minute=0, second=0, microsecond=0)
+		return due if due > now else due + DIGEST_PERIODS["daily"]
+
+
+def queue_for_digest(msg, summary):
+		"""Spool the facility message and its summary row to disk until the next digest."""
+		DIGEST_DIR.mkdir(parents=True, exist_ok=True)
+		stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+		(DIGEST_DIR / f"{stamp}.eml").write_bytes(msg.as_bytes())
+		(DIGEST_DIR / f"{stamp}.json").write_text(json.dumps(summary, default=str))
+		
+		
+def build_digest_html(rows):
+		"""Summary table of the queued submissions."""
+		columns = list(rows[0].keys()) if rows else []
+		head = "".join(f"<th style='text-align:left;padding:4px 8px;border-bottom:2px solid #0055a4;'>{html.escape(c)}</th>" for c in columns)
+		body = "".join(
+				"<tr>" + "".join(f"<td style='padding:4px 8px;border-bottom:1px solid #ddd;'>{html.escape(str(r.get(c, '-')))}</td>" for c in columns) + "</tr>"
+				for r in rows
+		)
+		return f"""
+<html>
+<body style="font-family:'Segoe UI', Helvetica, Arial, sans-serif;color:#333;">
+	<h2 style="color:#002145;">Rodent Transfer Requests — Digest ({len(rows)})</h2>
+	<table style="border-collapse:collapse;font-size:14px;"><tr>{head}</tr>{body}</table>
+	<p style="font-size:13px;color:#666;margin-top:20px;">
+		Each request's PDF form and attachments are included below.
+		This digest was generated by the <em>Rodent Transfer Portal</em>.
+	</p>
+</body>
+</html>
+"""
+
+
+def flush_digest():
+		"""Send everything queued as consolidated digest message(s) over one SMTP connection."""
+		with digest_lock():
+				stamps = sorted(p.stem for p in DIGEST_DIR.glob("*.json")) if DIGEST_DIR.exists() else []
+				if not stamps:
+						return 0
+						
+				# Group queued submissions into messages under the size limit
+				batches, batch, size = [], [], 0
+				for stamp in stamps:
+						item_size = (DIGEST_DIR / f"{stamp}.eml").stat().st_size
+						if batch and size + item_size > DIGEST_MAX_BYTES:
+								batches.append(batch)
+								batch, size = [], 0
+						batch.append(stamp)
+						size += item_size
+				batches.append(batch)
+				
+				messages = []
+				for i, batch in enumerate(batches, 1):
+						rows = [json.loads((DIGEST_DIR / f"{stamp}.json").read_text()) for stamp in batch]
+						msg = EmailMessage()
+						part = f" ({i}/{len(batches)})" if len(batches) > 1 else ""
+						msg["Subject"] = f"[TransferToCCM] Digest — {len(rows)} request(s), {datetime.now():%b %d, %Y %H:%M}{part}"
+						msg["From"] = SENDER_EMAIL
+						msg["To"] = DEFAULT_EMAIL
+						msg.add_alternative(build_digest_html(rows), subtype="html")
+						for stamp in batch:
+								queued = message_from_bytes((DIGEST_DIR / f"{stamp}.eml").read_bytes(), policy=email_policy.default)
+								for att in queued.iter_attachments():
+										msg.add_attachment(
+												att.get_content(),
+												maintype=att.get_content_maintype(),
+												subtype=att.get_content_subtype(),
+												filename=att.get_filename(),
+										)
+						messages.append(msg)
+						
+				send_messages(messages)
+				for stamp in stamps:
+						(DIGEST_DIR / f"{stamp}.eml").unlink(missing_ok=True)
+						(DIGEST_DIR / f"{stamp}.json").unlink(missing_ok=True)
+				return len(stamps)
+				
+				
+@st.cache_resource
+def digest_lock():
+		return threading.Lock()
+
+
+@st.cache_resource
+def digest_scheduler():
+		"""Background thread (one per server) that flushes the queue on schedule."""
+		def run():
+				due = next_digest_due(datetime.now())
+				while True:
+						time.sleep(30)
+						if datetime.now() < due:
+								continue
+						try:
+								sent = flush_digest()
+								print(f"✅ Digest sent ({sent} request(s))" if sent else "Digest: nothing queued")
+						except Exception as e:
+								print(f"⚠️ Digest send failed, will retry next period: {e}")
+						due = next_digest_due(datetime.now())
+		thread = threading.Thread(target=run, name="digest-scheduler", daemon=True)
+		thread.start()
+		return thread
+
+
+if DIGEST_MODE in DIGEST_PERIODS:
+		digest_scheduler()
+		
+		
+# =========================================================
+# NOTIFICATIONS — concurrent fan-out (asyncio)
+# =========================================================
+def post_webhook(url, payload, timeout):
+		"""POST a JSON message to a Teams/Slack-style incoming webhook."""
+		req = urllib.request.Request(
+				url,
+				data=json.dumps(payload).encode("utf-8"),
+				headers={"Content-Type": "application/json"},
+				method="POST",
+		)
+		with urllib.request.urlopen(req, timeout=timeout) as resp:
+				resp.read()
+				
+				
+@st.cache_resource
+def notify_pool():
+		"""
+		Worker threads for blocking senders. Kept outside asyncio's default executor so a
+		timed-out sender does not hold up asyncio.run() while its thread winds down.
+		"""
+		return ThreadPoolExecutor(max_workers=8, thread_name_prefix="notify")
+
+
+NOTIFY_UPLOAD_BPS = 64 * 1024   # assumed worst-case upload rate when sizing an email's time budget
+NOTIFY_PENDING = "still sending"  # notify_all() result: budget exceeded, but the worker thread is still delivering
+
+
+def message_budget(msg, base):
+		"""Time budget for sending `msg`: the channel's base timeout plus its upload time at NOTIFY_UPLOAD_BPS."""
+		return base + len(msg.as_bytes()) / NOTIFY_UPLOAD_BPS
+
+
+def _log_late_result(name, started):
+		def log(future):
+				error = future.exception()
+				print(f"{'✅' if error is None else '⚠️'} {name}: {error or 'sent'} after its budget ({time.monotonic() - started:.2f}s)")
+		return log
+
+
+async def _deliver(name, send, timeout):
+		"""
+		Run one blocking sender in a worker thread, waiting up to its time budget.
+		A thread cannot be cancelled, so a send still running at the deadline is
+		reported as NOTIFY_PENDING (it may well succeed) and its outcome is logged later.
+		"""
+		started = time.monotonic()
+		job = notify_pool().submit(send)
+		try:
+				await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job)), timeout)
+				error = None
+		except asyncio.TimeoutError:
+				job.add_done_callback(_log_late_result(name, started))
+				error = NOTIFY_PENDING
+		except Exception as e:
+				error = str(e) or e.__class__.__name__
+		print(f"{'✅' if error is None else '⚠️'} {name}: {error or 'sent'} ({time.monotonic() - started:.2f}s)")
+		return name, error
+
+
+async def _fan_out(targets):
+		return await asyncio.gather(*(_deliver(name, send, timeout) for name, send, timeout in targets))
+
+
+def notify_all(targets):
+		"""
+		Send to every (name, callable, timeout) target at the same time.
+		Returns {name: None on success, NOTIFY_PENDING, or an error message}; total latency is that of the slowest target.
+		"""
+		return dict(asyncio.run(_fan_out(targets)))
+
+
+# =========================================================
+# REPORTING — submission journal + incremental Parquet export
+# =========================================================
+# Summary dimension -> storage column (see FORM_SCHEMA)
+REPORT_DIMENSIONS = {"protocol": "acc_protocol", "strain": "strain", "facility": "facility", "tumour": "tumour_bearing"}
+REPORT_EXPORT_S = 15 * 60   # export cadence; each submission also triggers an export
+REPORT_FINGERPRINT = ("document_id", "pdf_sha256", "packet_sha256")   # see pdf_fingerprint()
+
+
+@st.cache_resource
+def report_lock():
+	return threading.Lock()
+
+
+def record_submission(form_data, submission_id, fingerprint):
+	"""Append the submission's storage row and PDF fingerprint to the journal read by export_reports()."""
+	record = {
+		"submission_id": submission_id, "submitted_at": datetime.now().isoformat(timespec="seconds"),
+		**fingerprint, **FORM.storage_row(form_data),
+	}
+	with report_lock():
+		SUBMISSION_LOG.parent.mkdir(parents=True, exist_ok=True)
+		with open(SUBMISSION_LOG, "a", encoding="utf-8") as f:
+			f.write(json.dumps(record, default=str) + "\n")
+			
+			
+def _report_frame(records):
+	"""Typed DataFrame of journal records with the month key and normalised summary dimensions."""
+	df = pd.DataFrame.from_records(records)
+	for column in (*REPORT_FINGERPRINT, *FORM.columns):
+		if column not in df:
+			df[column] = None
+	df[list(REPORT_FINGERPRINT)] = df[list(REPORT_FINGERPRINT)].fillna("").astype(str)
+	df["month"] = pd.to_datetime(df["submitted_at"]).dt.strftime("%Y-%m")
+	df["animals"] = pd.to_numeric(df["animals"], errors="coerce").fillna(0).astype("int64")
+	df["transfer_date"] = pd.to_datetime(df["transfer_date"], format="%b %d, %Y", errors="coerce")
+	text = [c for c in FORM.columns if c not in ("animals", "transfer_date")]
+	df[text] = df[text].fillna("").astype(str)
+	for column in REPORT_DIMENSIONS.values():
+		df[column] = df[column].str.strip().str.replace(r"\s+", " ", regex=True)
+	df["acc_protocol"] = df["acc_protocol"].str.upper()
+	df[list(REPORT_DIMENSIONS.values())] = df[list(REPORT_DIMENSIONS.values())].replace({"": "(not given)", "-": "(not given)"})
+	return df[["submission_id", "submitted_at", "month", *REPORT_FINGERPRINT, *FORM.columns]]
+
+
+def _summarise(rows, column):
+	return rows.groupby(["month", column], as_index=False).agg(submissions=("submission_id", "size"), animals=("animals", "sum"))
+
+
+def _write_parquet(df, path):
+	path.parent.mkdir(parents=True, exist_ok=True)
+	tmp = path.with_suffix(".tmp")
+	df.to_parquet(tmp, index=False)
+	tmp.replace(path)
 	
 	
+def export_reports():
+	"""
+	Export journal records added since the last run. Only the months they fall in
+	are touched: each month partition (reports/submissions/month=YYYY-MM/) is
+	rewritten deduplicated by submission_id, and those months are recomputed in
+	the summary tables (reports/summaries/by_<dimension>.parquet), so a re-run
+	after a crash never double counts. Returns the number of new records.
+	"""
+	with report_lock():
+		state_path = REPORT_DIR / "export_state.json"
+		offset = json.loads(state_path.read_text())["offset"] if state_path.exists() else 0
+		if not SUBMISSION_LOG.exists() or SUBMISSION_LOG.stat().st_size <= offset:
+			return 0
+		with open(SUBMISSION_LOG, "rb") as f:
+			f.seek(offset)
+			chunk = f.read()
+		chunk = chunk[:chunk.rfind(b"\n") + 1]   # complete lines only
+		if not chunk:
+			return 0
+		new = _report_frame([json.loads(line) for line in chunk.splitlines() if line.strip()])
+		
+		months = {}
+		for month, rows in new.groupby("month"):
+			path = REPORT_DIR / "submissions" / f"month={month}" / "part-0.parquet"
+			if path.exists():
+				rows = pd.concat([pd.read_parquet(path).assign(month=month), rows], ignore_index=True)
+				rows = rows.drop_duplicates("submission_id", keep="last")
+			_write_parquet(rows.drop(columns="month"), path)   # the month lives in the directory name
+			months[month] = rows
+			
+		for name, column in REPORT_DIMENSIONS.items():
+			fresh = pd.concat([_summarise(rows, column) for rows in months.values()], ignore_index=True)
+			path = REPORT_DIR / "summaries" / f"by_{name}.parquet"
+			if path.exists():
+				kept = pd.read_parquet(path)
+				fresh = pd.concat([kept[~kept["month"].isin(list(months))], fresh], ignore_index=True)
+			_write_parquet(fresh.sort_values(["month", column], ignore_index=True), path)
+			
+		state_path.write_text(json.dumps({"offset": offset + len(chunk), "exported_at": datetime.now().isoformat(timespec="seconds")}))
+		return len(new)
+		
+		
+def verify_pdf(data):
+	"""
+	Check a re-downloaded transfer PDF against the journal. Returns (status, record):
+	"match" (byte-identical to a submitted form or packet), "modified" (carries the
+	document ID of a submission but its bytes differ) or "unknown".
+	"""
+	digest = hashlib.sha256(data).hexdigest()
+	try:
+		doc_id = embedded_document_id(io.BytesIO(data))
+	except Exception:
+		doc_id = None   # not a PDF we can parse: only the byte hash can match
+	found = None
+	if SUBMISSION_LOG.exists():
+		with open(SUBMISSION_LOG, encoding="utf-8") as f:
+			for line in f:
+				if digest not in line and not (doc_id and doc_id in line):
+					continue
+				record = json.loads(line)
+				if digest in (record.get("pdf_sha256"), record.get("packet_sha256")):
+					return "match", record
+				if doc_id and record.get("document_id") == doc_id:
+					found = record
+	return ("modified", found) if found else ("unknown", None)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def report_summary(dimension, period, mtime):
+	"""
+	Totals per value of `dimension` (and per month) for a year ("2026") or a month
+	("2026-10"), from the pre-aggregated summary table; `mtime` keys the cache.
+	"""
+	column = REPORT_DIMENSIONS[dimension]
+	df = pd.read_parquet(REPORT_DIR / "summaries" / f"by_{dimension}.parquet")
+	df = df[df["month"].str.startswith(period)]
+	by_value = df.groupby(column, as_index=False)[["submissions", "animals"]].sum().sort_values("animals", ascending=False, ignore_index=True)
+	by_month = df.groupby("month")[["submissions", "animals"]].sum()
+	return by_value, by_month
+
+
+@st.cache_resource
+def report_exporter():
+	"""Background thread (one per server) running export_reports(); set() the returned event to export now."""
+	wake = threading.Event()
+	def run():
+		while True:
+			wake.wait(REPORT_EXPORT_S)
+			wake.clear()
+			try:
+				exported = export_reports()
+				if exported:
+					print(f"✅ Report export: {exported} new submission(s)")
+			except Exception as e:
+				print(f"⚠️ Report export failed, will retry: {e}")
+	threading.Thread(target=run, name="report-exporter", daemon=True).start()
+	return wake
+
+
+report_exporter()
+
+
 # -------------------------
 # Submit + Email
 # -------------------------
 if st.session_state.form_data and not st.session_state.locked:
-		if st.button("✅ Submit Request"):
+		stored_errors = FORM.validate(st.session_state.form_data)
+		if stored_errors:
+			st.caption("Fix the fields listed above and preview the PDF again to enable submission.")
+		if st.button("✅ Submit Request", disabled=bool(stored_errors)):
 			
 				form_data = st.session_state.form_data
 				filename = st.session_state.filename
@@ -905,60 +2746,120 @@ if st.session_state.form_data and not st.session_state.locked:
 				# Use the same base name for both PDF and email subject
 				subject = base_name
 				filename = f"{base_name}.pdf"
-			
+				
+				# Optional single packet PDF (form + PDF uploads, streamed to disk)
+				merged_names = ()
+				if send_packet:
+					filename = f"{base_name}_Packet.pdf"
+					merged_names = create_packet(form_data, attachments, st.session_state.inspections, filename)
+				else:
+					# Re-render: photos may have finished processing since the preview was written
+					create_pdf(form_data, attachments, filename)
+					
+				# Fingerprint of the attached PDF, recorded with the submission for later verification
+				doc_id, pdf_sha256 = pdf_fingerprint(filename)
+				fingerprint = {"document_id": doc_id, "packet_sha256" if send_packet else "pdf_sha256": pdf_sha256}
+				
 				# Build HTML email
-				email_html = build_email_html(
-					transfer_date,
-					tumour,
-					tumour_info,
-					weight_loss,
-					tumour_volume_limit,
-					distress_signs,
-					st.session_state.form_data,  # all form fields
-					uploaded_files               # list of attached files
-				)
+				email_html = build_email_html(form_data, attachments, fingerprint)
+				email_text = build_email_text(form_data, attachments, fingerprint)
 				try:
-					# Always send to facility
+					# Always send to facility (batched into the digest unless urgent)
 					main_recipient = DEFAULT_EMAIL
 					cc_list = [requester_email] if send_copy and requester_email else None
-					
-					send_email(
-						recipient=main_recipient,
-						subject=subject,
-						html_body=email_html,
-						file_path=filename,
-						cc=cc_list,
+					queued = DIGEST_MODE in DIGEST_PERIODS and not is_urgent(form_data)
+					facility_msg = build_message(
+						main_recipient, subject, email_html, filename,
+						cc=None if queued else cc_list, merged_names=merged_names, attachments=attachments,
+						text_body=email_text,
 					)
 					
+					record = FORM.storage_row(form_data)
+					targets = []
+					if queued:
+						queue_for_digest(facility_msg, {FORM.column_labels[c]: record[c] for c in DIGEST_COLUMNS})
+					else:
+						targets.append(("facility", lambda: send_messages([facility_msg], NOTIFY_TIMEOUTS["facility"]), message_budget(facility_msg, NOTIFY_TIMEOUTS["facility"])))
+						
 					# Optional auto-send receipt to requester
 					if send_copy and requester_email:
 						receipt_name = f"Receipt_{subject}.pdf"
 						create_pdf(form_data, attachments, receipt_name)
-						send_email(
-							recipient=requester_email,
-							subject=f"Receipt: Rodent Transfer Request ({subject})",
-							html_body=email_html,
-							file_path=receipt_name,
+						receipt_msg = build_message(
+							requester_email, f"Receipt: Rodent Transfer Request ({subject})", email_html, receipt_name,
+							attachments=attachments, text_body=email_text,
+						)
+						targets.append(("receipt", lambda: send_messages([receipt_msg], NOTIFY_TIMEOUTS["receipt"]), message_budget(receipt_msg, NOTIFY_TIMEOUTS["receipt"])))
+						
+					# PI / veterinary CC list (form PDF only)
+					if NOTIFY_CC:
+						cc_msg = build_message(
+							", ".join(NOTIFY_CC), f"CC: {subject}", email_html, filename,
+							merged_names=merged_names, text_body=email_text,
 						)
+						targets.append(("cc", lambda: send_messages([cc_msg], NOTIFY_TIMEOUTS["cc"]), message_budget(cc_msg, NOTIFY_TIMEOUTS["cc"])))
+						
+					# Chat webhook (Teams/Slack or a local stand-in), worded from the submitted form
+					if WEBHOOK_URL:
+						webhook_payload = {
+							"text": (
+								f"New rodent transfer request: {record['animals']} {record['sex']} {record['strain']} from {record['facility']} "
+								f"({record['requester']}, {record['acc_protocol']}) on {record['transfer_date']}"
+								+ (" — tumour-bearing" if record["tumour_bearing"] == "Yes" else "")
+							)
+						}
+						targets.append(("webhook", lambda: post_webhook(WEBHOOK_URL, webhook_payload, NOTIFY_TIMEOUTS["webhook"]), NOTIFY_TIMEOUTS["webhook"]))
+						
+					# All channels go out at once; a facility failure is reported only after the others finish
+					results = notify_all(targets)
+					if results.get("facility") not in (None, NOTIFY_PENDING):
+						others = [name for name, err in results.items() if name != "facility" and err is None]
+						raise RuntimeError(f"facility email failed: {results['facility']}" + (f" ({', '.join(others)} sent)" if others else ""))
+					notes = [
+						("info", f"⏳ The {name} email is large and still being delivered in the background; please don't resubmit.")
+						if err == NOTIFY_PENDING else ("warning", f"⚠️ {name.capitalize()} notification failed: {err}")
+						for name, err in results.items() if err
+					]
+					
+					# Journal the submission for reporting (exported to Parquet in the background)
+					try:
+						record_submission(form_data, uuid.uuid4().hex, fingerprint)
+						report_exporter().set()
+					except OSError as e:
+						print(f"⚠️ Could not journal submission for reporting: {e}")
 						
 					# ✅ Visual + text feedback
 					st.session_state.locked = True
-					st.success("✅ Transfer request successfully submitted!")
-					if send_copy and requester_email:
-						st.info("📩 Confirmation emails were sent to the requester and facility.")
+					notes.insert(0, ("success", "✅ Transfer request successfully submitted!"))
+					notes.insert(1, ("caption", f"🔐 PDF SHA-256: {pdf_sha256}"))
+					if queued:
+						notes.append(("info", f"📥 Queued for the facility's {DIGEST_MODE} digest (not urgent)."))
+						if send_copy and requester_email:
+							notes.append(("info", "📩 A receipt was sent to the requester."))
+					elif send_copy and requester_email:
+						notes.append(("info", "📩 Confirmation emails were sent to the requester and facility."))
 					else:
-						st.info("📩 Confirmation email was sent to the facility only.")
+						notes.append(("info", "📩 Confirmation email was sent to the facility only."))
 						
-					# ⚠️ Extra warning if no monitoring sheets were attached
-					if not any("monitor" in f.name.lower() for f in attachments):
-						st.warning(
+					# ⚠️ Extra warning if no monitoring sheets were attached (ticked by the user, still being
+					# inspected, or any readable file mentioning monitoring all count as attached)
+					monitor_attached = st.session_state.get("chk_monitor") or any(
+						r is None or (r["ok"] and (r["kind"] == "monitor" or r["scores"].get("monitor")))
+						for r in st.session_state.inspections.values()
+					)
+					if not monitor_attached:
+						notes.append(("warning",
         				f"⚠️ Monitoring sheets were not attached. "
        				    f"Please send them to the Facility Manager at {DEFAULT_EMAIL} "
         			    "at least 24 hours before the transfer, and no later than the time the animals arrive at CCM."
-                     )
+                     ))
 						
+					# Everything has been dispatched: free the uploads before showing the result
+					st.session_state.submit_notes = notes
+					discard_draft()
+					release_session_memory()
 					#st.balloons()
-					st.stop()
+					st.rerun()
 					
 				except Exception as e:
 					st.error(f"❌ An error occurred while sending emails - please contact {DEFAULT_EMAIL}: {e}")
@@ -969,6 +2870,8 @@ if st.session_state.form_data and not st.session_state.locked:
 # Reset for new request
 # -------------------------
 if st.session_state.locked:
+	for kind, text in st.session_state.get("submit_notes", []):
+		getattr(st, kind)(text)
 	st.divider()
 	st.write("✅ This request is complete.")
 	
@@ -978,3 +2881,41 @@ if st.session_state.locked:
 			st.rerun()
 		else:
 			st.experimental_rerun()		
+
+
+# =========================================================
+# REPORTS PANEL (access keys listed in REPORT_USERS)
+# =========================================================
+if password.strip().lower() in REPORT_USERS:
+	with st.expander("📊 Transfer reports"):
+		summary_path = REPORT_DIR / "summaries" / "by_tumour.parquet"
+		if st.button("🔄 Export new submissions now"):
+			st.caption(f"{export_reports()} new submission(s) exported.")
+		if not summary_path.exists():
+			st.caption("No submissions have been exported yet.")
+		else:
+			mtime = summary_path.stat().st_mtime
+			months = sorted(pd.read_parquet(summary_path, columns=["month"])["month"].unique(), reverse=True)
+			periods = sorted({m[:4] for m in months}, reverse=True) + months
+			period = st.selectbox("Period", periods, help="A year, or a single month")
+			dimension = st.radio("Group by", list(REPORT_DIMENSIONS), horizontal=True, format_func=str.capitalize)
+			by_value, by_month = report_summary(dimension, period, mtime)
+			st.dataframe(by_value, width="stretch", hide_index=True)
+			if len(by_month) > 1:
+				st.bar_chart(by_month["animals"], x_label="Month", y_label="Animals")
+			st.download_button(
+				"⬇️ Summary (Parquet)",
+				(REPORT_DIR / "summaries" / f"by_{dimension}.parquet").read_bytes(),
+				file_name=f"transfers_by_{dimension}.parquet",
+			)
+			st.caption(f"Monthly partitions: {REPORT_DIR / 'submissions'}")
+			
+		checked = st.file_uploader("🔎 Verify a transfer PDF", type=["pdf"], key="verify_pdf")
+		if checked is not None:
+			status, record = verify_pdf(checked.getvalue())
+			if status == "match":
+				st.success(f"✅ Identical to the PDF submitted by {record['requester']} on {record['submitted_at']} (protocol {record['acc_protocol']}).")
+			elif status == "modified":
+				st.error(f"❌ This PDF claims to be the form submitted on {record['submitted_at']}, but its contents have changed.")
+			else:
+				st.warning("⚠️ No submission with this PDF's hash or document ID was found.")
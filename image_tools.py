@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Image attachment processing for the Rodent Transfer Portal.
+
+Kept in its own module (no Streamlit imports) so the functions can be pickled
+and run in the process pool started by Transfer.py.
+"""
+import io
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# HEIC/HEIF (iPhone photos) needs the optional pillow-heif plugin
+try:
+	from pillow_heif import register_heif_opener
+	register_heif_opener()
+	HEIF_SUPPORTED = True
+except ImportError:
+	HEIF_SUPPORTED = False
+
+IMAGE_EXTS = ("jpg", "jpeg", "png") + (("heic", "heif") if HEIF_SUPPORTED else ())
+
+EMAIL_MAX_PX = 1600     # longest side of the copy sent by email
+EMAIL_QUALITY = 80
+THUMB_MAX_PX = 320      # longest side of the PDF contact-sheet thumbnail
+THUMB_QUALITY = 70
+ORIENTATION_TAG = 0x0112
+
+
+def _to_rgb(img):
+	"""Flatten transparency onto white and convert to RGB for JPEG output."""
+	if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+		img = img.convert("RGBA")
+		flat = Image.new("RGB", img.size, (255, 255, 255))
+		flat.paste(img, mask=img.split()[-1])
+		return flat
+	return img.convert("RGB")
+
+
+def _jpeg(img, max_px, quality):
+	small = img.copy()
+	small.thumbnail((max_px, max_px), Image.LANCZOS)
+	buf = io.BytesIO()
+	small.save(buf, "JPEG", quality=quality, optimize=True, progressive=True)
+	return buf.getvalue()
+
+
+def process_image(data, digest):
+	"""
+	Decode an uploaded photo, fix its EXIF orientation and produce an email-size
+	JPEG plus a contact-sheet thumbnail. Returns a result shaped like the
+	document inspections in Transfer.py (runs in a worker process).
+	"""
+	result = {
+		"sha256": digest, "size": len(data), "ok": True, "error": None,
+		"pages": None, "sheets": None, "scores": {}, "image": None,
+	}
+	try:
+		with Image.open(io.BytesIO(data)) as img:
+			width, height = img.size
+			if img.getexif().get(ORIENTATION_TAG) in (5, 6, 7, 8):
+				width, height = height, width   # report the upright size
+			img.draft("RGB", (EMAIL_MAX_PX, EMAIL_MAX_PX))   # JPEG: decode at reduced scale
+			img = _to_rgb(ImageOps.exif_transpose(img))
+		result["image"] = {
+			"width": width,
+			"height": height,
+			"email": _jpeg(img, EMAIL_MAX_PX, EMAIL_QUALITY),
+			"thumb": _jpeg(img, THUMB_MAX_PX, THUMB_QUALITY),
+		}
+	except UnidentifiedImageError:
+		result.update(ok=False, error="unrecognised or unsupported image format")
+	except (OSError, ValueError, Image.DecompressionBombError) as e:
+		result.update(ok=False, error=str(e) or e.__class__.__name__)
+	return result